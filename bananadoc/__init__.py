@@ -57,14 +57,19 @@ $
 '''
 
 from bananadoc.parse import (
-    NoDocstring, Section, ObjectSection, parsingfunc, modulehook, parse_module)
+    NoDocstring, Section, ObjectSection, parsingfunc, modulehook, parse_module,
+    dispatch_stats, cache_info)
+from bananadoc import datarepr  # noqa
 from bananadoc import defaults  # noqa
+from bananadoc import renderers  # noqa
+from bananadoc.static import parse_module_static
 
 __all__ = [
-    'defaults', 'cmdline',          # submodules
-    'Section', 'ObjectSection',     # classes
-    'parsingfunc', 'modulehook',    # hook decorators
-    'parse_module',                 # misc functions
-    'NoDocstring',                  # exceptions
+    'defaults', 'cmdline', 'static', 'renderers', 'datarepr',  # submodules
+    'Section', 'ObjectSection',         # classes
+    'parsingfunc', 'modulehook',        # hook decorators
+    'parse_module', 'parse_module_static',  # misc functions
+    'dispatch_stats', 'cache_info',     # statistics
+    'NoDocstring',                      # exceptions
 ]
 __version__ = '0.1'
@@ -0,0 +1,151 @@
+# Copyright (c) 2017 Akuli
+
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""Save the progress of a run so that it can be continued later.
+
+The checkpoint is a JSON file in the output directory. It's written
+every now and then while documenting, and when the run stops because
+of an error or Ctrl+C. It contains everything that is needed for
+treating the finished modules as done, so `--resume` documents only
+the modules that were not finished, that failed or whose files changed
+after they were documented.
+
+The checkpoint is removed when everything was documented successfully.
+"""
+
+import json
+import os
+import tempfile
+import time
+
+
+FILENAME = '.bananadoc-checkpoint.json'
+VERSION = 2
+
+
+def _stamp(path):
+    try:
+        result = os.stat(path)
+    except OSError:
+        return None
+    return [result.st_mtime_ns, result.st_size]
+
+
+def _stamps(info):
+    # The directories of a package change when submodules are added or
+    # removed.
+    paths = (set(info['files']) | set(info['path'])
+             | {os.path.abspath(info['filename'])})
+    return {path: _stamp(path) for path in sorted(paths)}
+
+
+class Checkpoint:
+    """The checkpoint of an output directory.
+
+    The *fingerprint* should be like the fingerprint of a
+    `bananadoc.manifest.Manifest`, and a saved checkpoint is used only if
+    the fingerprint is the same. If *resume* is false, the saved
+    checkpoint is ignored and overwritten.
+    """
+
+    def __init__(self, outdir, fingerprint, resume=False, interval=10):
+        self.path = os.path.join(outdir, FILENAME)
+        self.fingerprint = fingerprint
+        self.interval = interval
+        self.failed = {}        # {modname: error message}
+        self._done = {}         # {modname: [info, stamps]}
+        self._last_save = time.monotonic()
+        if not resume:
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                content = json.load(f)
+        except (OSError, ValueError):
+            return
+        if (content.get('version') == VERSION
+                and content.get('fingerprint') == fingerprint):
+            self._done = content['done']
+
+    def __len__(self):
+        return len(self._done)
+
+    def lookup(self, modname):
+        """Return the dict saved for a module or None.
+
+        The dict is the one given to
+        [bananadoc.checkpoint.Checkpoint.done]. None is also returned if
+        the files of the module changed after it was documented.
+        """
+        try:
+            info, stamps = self._done[modname]
+        except KeyError:
+            return None
+        if _stamps(info) != stamps:
+            return None
+        return info
+
+    def done(self, modname, info):
+        """Remember that *modname* was documented.
+
+        *info* should be a JSON-compatible dict with at least
+        `'filename'`, `'files'` and `'path'` keys like in
+        `bananadoc.manifest`. The modification times of those files are
+        saved too. Make sure that the output files of *modname* have
+        been written before calling this.
+        """
+        self._done[modname] = [info, _stamps(info)]
+        self.failed.pop(modname, None)
+
+    def fail(self, modname, message):
+        """Remember that documenting *modname* failed."""
+        self.failed[modname] = message
+
+    def needs_saving(self):
+        """Check if *interval* seconds have passed since the last save."""
+        return time.monotonic() - self._last_save >= self.interval
+
+    def save(self):
+        """Write the checkpoint to the output directory.
+
+        The file is replaced atomically, so a crash in the middle of
+        saving doesn't destroy the previous checkpoint.
+        """
+        directory = os.path.dirname(self.path) or os.curdir
+        os.makedirs(directory, exist_ok=True)
+        fd, temp = tempfile.mkstemp(prefix='.bananadoc-checkpoint.',
+                                    suffix='.tmp', dir=directory)
+        try:
+            with open(fd, 'w', encoding='utf-8') as f:
+                json.dump({'version': VERSION,
+                           'fingerprint': self.fingerprint,
+                           'done': self._done, 'failed': self.failed}, f)
+            os.replace(temp, self.path)
+        except BaseException:
+            os.remove(temp)
+            raise
+        self._last_save = time.monotonic()
+
+    def remove(self):
+        """Delete the saved checkpoint if there is one."""
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
@@ -27,24 +27,36 @@ but `python3 -m bananadoc` runs this module.
 
 import argparse
 import collections
+import concurrent.futures
+import contextlib
+import functools
 import importlib
 import os
+import queue
 import shutil
 import sys
 import textwrap
+import time
 
 import bananadoc
+import bananadoc.checkpoint
+import bananadoc.datarepr
+import bananadoc.ir
+import bananadoc.links
+import bananadoc.manifest
+import bananadoc.output
+import bananadoc.profiling
+import bananadoc.renderers
+import bananadoc.search
+import bananadoc.server
+import bananadoc.shard
+import bananadoc.watch
+import bananadoc.workers
 
 
 __all__ = ['main']
 
 
-def mkdir_open(path, *args, **kwargs):
-    directory = os.path.dirname(path)
-    os.makedirs(directory, exist_ok=True)
-    return open(path, *args, **kwargs)
-
-
 def nice_path(absolute):
     relative = os.path.relpath(absolute, os.getcwd())
     if relative.startswith(os.pardir + os.sep):
@@ -76,31 +88,441 @@ def table(strings):
         print(" ", line)
 
 
-_desc = "Generate Markdown documentation from Python docstrings."
+def _outfiles(outdir, rootname, modname, is_package, formats):
+    path = bananadoc.links.module_path(rootname, modname, is_package)
+    base = os.path.splitext(os.path.join(outdir, *path.split('/')))[0]
+    return [base + bananadoc.renderers.get_renderer(name).extension
+            for name in formats]
 
 
-def main():
-    """Run the command-line interface.
+# This is what _document() returns. Everything in it can be pickled, so
+# it can be sent from a worker process to the main process.
+# The outputs are a {format: content} dict, or None if the module was up
+# to date or it wasn't rendered yet. The tree is a flattened section tree
+# (see bananadoc.ir) if the main process must render the module, because
+# it has [dotted.name] references or it was parsed in an isolated worker.
+# The index is a list of bananadoc.search entries and targets is a list
+# of link targets, and they are None if the module wasn't rendered. The
+# symbols come from bananadoc.links.symbols(), and limited is a list of
+# [fullname, problems] lists for data that hit the bananadoc.datarepr
+# limits. seconds is how long _document() took, or None.
+_Documented = collections.namedtuple(
+    '_Documented', ('filename is_package outputs submodules files path '
+                    'exports tree index symbols targets limited seconds'))
 
-    This uses `sys.argv` and may use `sys.exit`.
+
+def _render(section, formats):
+    renderers = [bananadoc.renderers.get_renderer(name)()
+                 for name in formats]
+    return dict(zip(formats, bananadoc.renderers.render(section, renderers)))
+
+
+def _document(modname, static=False, registry=None, profiler=None,
+              tree=False, formats=('markdown',), limits=None):
+    """Import, parse and render a module in the given formats.
+
+    If *tree* is true, the section tree is flattened instead of rendered.
+    *limits* is set to `bananadoc.datarepr.limits` if it's not None,
+    because worker processes don't have the main process's limits.
+    """
+    start = time.perf_counter()
+    if limits is not None:
+        bananadoc.datarepr.limits = limits
+    if profiler is None:
+        measure = _dont_measure
+    else:
+        profiler.module = modname
+        measure = profiler.measure
+
+    if static:
+        with measure('import', 'phase'):
+            module = bananadoc.static.find_module(modname)
+        with measure('parse', 'phase'):
+            mainsection, subs = bananadoc.parse_module_static(
+                modname, registry)
+        files = bananadoc.static.dependencies(modname)
+        symbols = bananadoc.links.symbols(
+            mainsection, bananadoc.static.canonical_names(modname))
+    else:
+        with measure('import', 'phase'):
+            module = importlib.import_module(modname)
+        with measure('parse', 'phase'):
+            mainsection, subs = bananadoc.parse_module(modname, registry)
+        files = bananadoc.manifest.dependencies(mainsection)
+        symbols = bananadoc.links.symbols(mainsection)
+    # The tree is dumped without the documented objects.
+    mainsection.freeze()
+    # The data sections know which values were too big after freezing.
+    limited = [item for section in mainsection.walk_subs()
+               for item in getattr(section, 'limited', [])]
+    with measure('render', 'phase'):
+        # The references can be resolved only in the main process,
+        # because the other modules may be documented in other processes.
+        if tree or bananadoc.links.has_references(mainsection):
+            outputs = index = targets = None
+            rows = bananadoc.ir.flatten(mainsection)
+        else:
+            outputs = _render(mainsection, formats)
+            index = bananadoc.search.collect(mainsection)
+            targets = bananadoc.links.link_targets(mainsection)
+            rows = None
+
+    is_package = hasattr(module, '__path__')
+    if registry is None:
+        exports = []
+    else:
+        exports = registry.exports(modname, is_package)
+    return _Documented(
+        filename=module.__file__, is_package=is_package, outputs=outputs,
+        submodules=subs, files=sorted(files),
+        path=list(getattr(module, '__path__', [])), exports=exports,
+        tree=rows, index=index, symbols=symbols, targets=targets,
+        limited=limited, seconds=time.perf_counter() - start)
+
+
+def _render_tree(result, section, formats):
+    """Render the unflattened *section* tree of a result."""
+    return result._replace(
+        outputs=_render(section, formats), tree=None,
+        index=bananadoc.search.collect(section),
+        targets=bananadoc.links.link_targets(section))
+
+
+def _add_linked_files(result, linked, sources):
+    """Make a result depend on the modules that its links point to.
+
+    *linked* is a set of paths from `SymbolTable.resolve()`, and
+    *sources* is a `{path: source file}` dict. The module must be
+    documented again when the anchors in those files change.
     """
-    parser = argparse.ArgumentParser(description=_desc)
+    files = set(result.files)
+    files.update(sources[path] for path in linked if path in sources)
+    return result._replace(files=sorted(files))
+
+
+def _dont_measure(name, category):
+    return contextlib.nullcontext()
+
+
+def _init_worker(path):
+    # The main process may have added the current directory to sys.path
+    # after the worker processes were created.
+    sys.path[:] = path
+
+
+class _ParallelDocumenter:
+    """Document modules in a process pool.
+
+    The results come out in the order they are asked for, so the output
+    is exactly the same as without a pool. Submodules of every finished
+    module are sent to the pool right away, even though they will be
+    asked for later.
+    """
+
+    def __init__(self, pool, static, submodules, up_to_date, formats,
+                 tree=False, limits=None):
+        self._pool = pool
+        self._static = static
+        self._formats = formats
+        self._tree = tree
+        self._limits = limits
+        self._submodules = submodules
+        self._up_to_date = up_to_date
+        self._futures = {}      # {modname: future}
+        # The futures put themselves here when they are done.
+        self._done = queue.SimpleQueue()
+
+    def _submit(self, modname):
+        if modname not in self._futures and not self._up_to_date(modname):
+            future = self._pool.submit(_document, modname, self._static,
+                                       None, None, self._tree, self._formats,
+                                       self._limits)
+            future.add_done_callback(self._done.put)
+            self._futures[modname] = future
+
+    def _prefetch_submodules(self, future):
+        if (self._submodules and not future.cancelled()
+                and future.exception() is None):
+            for sub in future.result().submodules:
+                self._submit(sub)
+
+    def prefetch(self, modnames):
+        """Start documenting modules that will be asked for later."""
+        for modname in modnames:
+            self._submit(modname)
+
+    def document(self, modname):
+        self._submit(modname)
+        future = self._futures.pop(modname)
+        while not future.done():
+            self._prefetch_submodules(self._done.get())
+        try:
+            while True:
+                self._prefetch_submodules(self._done.get_nowait())
+        except queue.Empty:
+            pass
+        return future.result()
+
+
+def _index_path(outdir, outfiles):
+    # The first format is the one that search results point to.
+    return os.path.relpath(outfiles[0], outdir).replace(os.sep, '/')
+
+
+def _slim(result):
+    # The results in the known dicts of _build() and _watch() stay alive
+    # until the end, and only their files, submodules and link targets
+    # are needed, so the rendered outputs are not kept in memory.
+    return result._replace(outputs=None, tree=None, index=None, limited=[])
+
+
+def _watch(args, known, document, writer, manifest, index, symbols):
+    """Document modules again when their source files change.
+
+    *known* is a dict with module names as keys and `(outfiles, result)`
+    tuples as values, where the results come from `_slim()`. This runs
+    until Ctrl+C is pressed.
+    """
+    watcher = bananadoc.watch.FileWatcher()
+    for outfiles, result in known.values():
+        for path in result.files:
+            watcher.add(path)
+
+    if not args.quiet:
+        print()
+        print("Watching for changes, press Ctrl+C to stop...")
+    try:
+        while True:
+            time.sleep(args.watch_interval)
+            changed = watcher.changed()
+            if not changed:
+                continue
+
+            stale, failed = bananadoc.watch.reload_changed(changed, {
+                modname: (result.filename, result.files)
+                for modname, (outfiles, result) in known.items()},
+                args.static)
+            module_queue = collections.deque(stale)
+            for modname, error in failed:
+                print("Cannot reload %s: %s" % (modname, error))
+
+            while module_queue:
+                modname = module_queue.popleft()
+                try:
+                    result = document(modname)
+                except Exception as e:
+                    print("Cannot document %s: %s" % (modname, e))
+                    continue
+                linkpath = bananadoc.links.module_path(
+                    args.module, modname, result.is_package)
+                symbols.add(linkpath, result.symbols)
+                if result.tree is not None:
+                    section = bananadoc.ir.unflatten(result.tree)
+                    linked = set()
+                    symbols.resolve(section, linkpath, linked)
+                    result = _render_tree(result, section, args.format)
+                    result = _add_linked_files(result, linked, {
+                        bananadoc.links.module_path(
+                            args.module, name, other.is_package):
+                        os.path.abspath(other.filename)
+                        for name, (junk, other) in known.items()})
+                outfiles = _outfiles(args.outdir, args.module, modname,
+                                     result.is_package, args.format)
+                for name, outfile in zip(args.format, outfiles):
+                    writer.write(outfile, result.outputs[name])
+                writer.flush()
+                if not args.quiet:
+                    print(' ', nice_path(result.filename), '->',
+                          ', '.join(outfiles))
+                if manifest is not None:
+                    manifest.record(modname, result.filename,
+                                    result.is_package, outfiles,
+                                    result.submodules, result.files,
+                                    result.path, result.exports,
+                                    result.symbols)
+                    manifest.save()
+                if index is not None:
+                    index.add(modname, _index_path(args.outdir, outfiles),
+                              result.index)
+                    index.write(args.outdir)
+
+                known[modname] = (outfiles, _slim(result))
+                for path in result.files:
+                    watcher.add(path)
+                if not args.no_submodules:
+                    module_queue.extend(
+                        sub for sub in result.submodules if sub not in known)
+    except KeyboardInterrupt:
+        print()
+
+
+def _query(argv):
+    parser = argparse.ArgumentParser(
+        prog='bananadoc query',
+        description="Search the documentation written by bananadoc.")
     parser.add_argument(
-        'module', help="name of the module that will be documented")
+        'name', help="a full or partial name, or words to look for")
     parser.add_argument(
-        '-q', '--quiet', action='store_true', help="produce less output")
+        '-n', '--limit', type=int, default=20,
+        help="show at most this many results, defaults to %(default)s")
     parser.add_argument(
-        '-y', '--yes', action='store_true',
-        help="assume yes instead of asking questions")
+        '-o', '--outdir', default=os.path.join('docs', 'reference'),
+        help="the output directory of bananadoc, defaults to %(default)s")
+    args = parser.parse_args(argv)
+
+    try:
+        index = bananadoc.search.Index(args.outdir)
+    except FileNotFoundError:
+        parser.error("there's no search index in '%s', run bananadoc "
+                     "without --no-search-index first" % args.outdir)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+
+    matches = index.query(args.name, args.limit)
+    if not matches:
+        print("Nothing was found.")
+        sys.exit(1)
+    for match in matches:
+        path = os.path.join(args.outdir, *match.path.split('/'))
+        print(match.fullname or match.title, '->',
+              '%s#%s' % (path, match.anchor))
+
+
+def _merge(argv):
+    parser = argparse.ArgumentParser(
+        prog='bananadoc merge',
+        description=("Combine the output directories of bananadoc --shard "
+                     "to one output directory."))
     parser.add_argument(
-        '--no-submodules', action='store_true',
-        help="don't document submodules recursively")
+        '-q', '--quiet', action='store_true', help="produce less output")
     parser.add_argument(
         '-o', '--outdir', default=os.path.join('docs', 'reference'),
-        help="write output files here, defaults to %(default)s")
+        help="write the combined output here, defaults to %(default)s")
+    parser.add_argument(
+        'shards', nargs='+', metavar='SHARDDIR',
+        help="an output directory of bananadoc --shard")
+    args = parser.parse_args(argv)
 
-    args = parser.parse_args()
+    infos = []
+    for sharddir in args.shards:
+        if os.path.abspath(sharddir) == os.path.abspath(args.outdir):
+            parser.error("the output directory can't be one of the shards")
+        try:
+            infos.append(bananadoc.shard.read_info(sharddir))
+        except (OSError, ValueError) as e:
+            parser.error(str(e))
 
+    first = infos[0]
+    count = first['shard'][1]
+    for sharddir, info in zip(args.shards, infos):
+        for key in ['root', 'formats', 'fingerprint']:
+            if info[key] != first[key]:
+                parser.error("%s and %s were documented with different "
+                             "options" % (args.shards[0], sharddir))
+        if info['shard'][1] != count:
+            parser.error("%s and %s have different numbers of shards"
+                         % (args.shards[0], sharddir))
+    numbers = sorted(info['shard'][0] for info in infos)
+    if numbers != list(range(1, count + 1)):
+        missing = sorted(set(range(1, count + 1)) - set(numbers))
+        if missing:
+            parser.error("shard %d/%d is missing" % (missing[0], count))
+        parser.error("the same shard was given twice")
+
+    rootname = first['root']
+    formats = first['formats']
+    metafiles = {bananadoc.manifest.FILENAME, bananadoc.search.FILENAME,
+                 bananadoc.shard.FILENAME, bananadoc.shard.IR_FILENAME,
+                 bananadoc.output.FILENAME}
+    manifest = bananadoc.manifest.Manifest(args.outdir, first['fingerprint'],
+                                           load=False)
+    index = None
+    copied = {}     # {relative path: shard directory}
+    ir_modules = []
+
+    if not args.quiet:
+        print("Merging shards...")
+    for sharddir, info in zip(args.shards, infos):
+        for root, dirs, files in os.walk(sharddir):
+            dirs.sort()
+            for name in sorted(files):
+                if name in metafiles:
+                    continue
+                path = os.path.join(root, name)
+                relative = os.path.relpath(path, sharddir)
+                if relative in copied:
+                    parser.error("both %s and %s contain %s"
+                                 % (copied[relative], sharddir, relative))
+                copied[relative] = sharddir
+                target = os.path.join(args.outdir, relative)
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                shutil.copyfile(path, target)
+
+        # The shard's output directory may have been moved after it
+        # was written, so the paths in the manifest are fixed here.
+        entries = bananadoc.manifest.Manifest(
+            sharddir, info['fingerprint']).entries()
+        for modname in info['modules']:
+            entry = dict(entries[modname])
+            entry['outfiles'] = [
+                os.path.join(args.outdir, os.path.relpath(outfile,
+                                                          info['outdir']))
+                for outfile in entry['outfiles']]
+            manifest.add_entry(modname, entry)
+
+        if os.path.exists(os.path.join(sharddir, bananadoc.search.FILENAME)):
+            if index is None:
+                index = bananadoc.search.IndexWriter()
+            for modname, (path, module_entries) in (
+                    bananadoc.search.load_modules(sharddir).items()):
+                index.add(modname, path, module_entries)
+
+        junk, modules = bananadoc.ir.load(
+            os.path.join(sharddir, bananadoc.shard.IR_FILENAME))
+        ir_modules.extend(modules.values())
+        if not args.quiet:
+            print(' ', sharddir, '->', args.outdir,
+                  "(%s)" % _plural(len(info['modules']), 'module'))
+
+    # Now all the symbols are known, so the modules with references to
+    # other shards can be rendered.
+    symbols = bananadoc.links.SymbolTable()
+    for modname, entry in manifest.entries().items():
+        symbols.add(bananadoc.links.module_path(
+            rootname, modname, entry['is_package']), entry['symbols'])
+    writer = bananadoc.output.DirectoryWriter(args.outdir)
+    for relative in copied:
+        writer.keep(os.path.join(args.outdir, relative))
+    for module in ir_modules:
+        section = bananadoc.ir.unflatten(module.tree)
+        symbols.resolve(section, bananadoc.links.module_path(
+            rootname, module.name, module.is_package))
+        outputs = _render(section, formats)
+        outfiles = _outfiles(args.outdir, rootname, module.name,
+                             module.is_package, formats)
+        for name, outfile in zip(formats, outfiles):
+            writer.write(outfile, outputs[name])
+        if index is not None:
+            index.add(module.name, _index_path(args.outdir, outfiles),
+                      bananadoc.search.collect(section))
+    if index is not None:
+        writer.write(os.path.join(args.outdir, bananadoc.search.FILENAME),
+                     index.dumps())
+    writer.close()
+    manifest.save()
+
+    if not args.quiet:
+        print()
+        merged = len(manifest.entries())
+        print("%s from %s %s merged."
+              % (_plural(merged, 'module'), _plural(len(infos), 'shard'),
+                 'was' if merged == 1 else 'were'))
+        if ir_modules:
+            print(len(ir_modules), "of them had references to other shards "
+                  "and were rendered now.")
+
+
+def _add_cwd_to_path():
     # The current working directory needs to be the first thing on
     # sys.path because the documented module and the rc file come from
     # there.
@@ -111,62 +533,968 @@ def main():
         # sys.path[0] doesn't exist.
         sys.path.insert(0, os.getcwd())
 
-    # We need to check for this here because .stuff would later turn
-    # into /stuff.
-    if not all(args.module.split('.')):
-        parser.error("invalid module name %r" % args.module)
-
-    if os.path.exists(args.outdir):
-        # if --yes was given, leave it alone which is the default
-        if not args.yes:
-            if yesno("'%s' exists. Remove it?" % args.outdir, False):
-                if os.path.isdir(args.outdir):
-                    shutil.rmtree(args.outdir)
-                else:
-                    os.remove(args.outdir)
 
+def _serve(argv):
+    parser = argparse.ArgumentParser(
+        prog='bananadoc serve',
+        description=("Keep documentation in memory and render it when "
+                     "asked to over a UNIX socket."))
+    parser.add_argument(
+        '-q', '--quiet', action='store_true', help="produce less output")
+    parser.add_argument(
+        '--static', action='store_true',
+        help="parse the source files instead of importing the modules")
+    parser.add_argument(
+        '--cache-size', type=int, default=200, metavar='MB',
+        help=("forget least recently used modules when the cache is "
+              "bigger than this, defaults to %(default)s"))
+    parser.add_argument(
+        '-s', '--socket', default=bananadoc.server.FILENAME,
+        help="listen on this socket file, defaults to %(default)s")
+    args = parser.parse_args(argv)
+    if args.cache_size < 1:
+        parser.error("the cache size must be positive")
+
+    _add_cwd_to_path()
+    cache = bananadoc.server.Cache(args.static,
+                                   args.cache_size * 1024 * 1024)
+    try:
+        server = bananadoc.server.Server(
+            args.socket, cache, None if args.quiet else print)
+    except OSError as e:
+        parser.error(str(e))
+
+    with server:
+        if not args.quiet:
+            print("Listening on %s, press Ctrl+C to stop..." % args.socket)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            print()
+
+
+# The result of _build(). The counts and lists are like in the summary
+# that _build() prints, broken is None without --check-links and failed
+# is a list of (modname, error message) pairs from --keep-going.
+_Stats = collections.namedtuple(
+    '_Stats',
+    'documented up_to_date resumed undocumented limited broken failed')
+
+
+class _BuildState:
+    """The documented modules of a `_build()` call and their output.
+
+    `lookup()` finds modules that don't need to be documented again,
+    and `finish()` writes the files of a documented module and records
+    it in the manifest, search index and checkpoint. The counts are like
+    in the summary that `_build()` prints, and *known* is a dict for
+    `_watch()`.
+    """
+
+    def __init__(self, args, writer, manifest, checkpoint, registry,
+                 index, old_index, measure):
+        self.args = args
+        self.writer = writer
+        self.manifest = manifest
+        self.checkpoint = checkpoint
+        self.registry = registry
+        self.index = index
+        self.old_index = old_index
+        self.measure = measure
+        self.documented = 0
+        self.up_to_date = 0
+        self.resumed = 0
+        self.limited = []       # [fullname, problems] lists
+        self.known = {}
+        # [(modname, dict for checkpoint.done())] for modules whose files
+        # may be still being written.
+        self._unflushed = []
+        self._from_checkpoint = set()   # modnames
+
+    def lookup(self, modname):
+        """Return a result without outputs, or None if *modname* changed."""
+        if self.checkpoint is None:
+            info = None
+        else:
+            info = self.checkpoint.lookup(modname)
+        if (info is not None and self.index is not None
+                and info['index'] is None):
+            # The checkpoint is from a run with --no-search-index.
+            info = None
+        if info is not None:
+            if self.registry is not None:
+                self.registry.restore(modname, info['is_package'],
+                                      info['exports'])
+            self._from_checkpoint.add(modname)
+            return _Documented(
+                filename=info['filename'], is_package=info['is_package'],
+                outputs=None, submodules=info['submodules'],
+                files=info['files'], path=info['path'],
+                exports=info['exports'], tree=None, index=info['index'],
+                symbols=info['symbols'], targets=None,
+                limited=info['limited'], seconds=info['seconds'])
+        if not self.args.incremental:
+            return None
+        if self.index is not None and modname not in self.old_index:
+            # It must be documented again for the search index.
+            return None
+        entry = self.manifest.lookup(modname)
+        if entry is None:
+            return None
+        if self.registry is not None:
+            self.registry.restore(modname, entry['is_package'],
+                                  entry['exports'])
+        return _Documented(
+            filename=entry['filename'], is_package=entry['is_package'],
+            outputs=None, submodules=entry['submodules'],
+            files=entry['files'], path=entry['path'],
+            exports=entry['exports'], tree=None, index=None,
+            symbols=entry['symbols'], targets=None, limited=[],
+            seconds=entry['seconds'])
+
+    def finish(self, modname, result):
+        """Write the files of a rendered or looked up module."""
+        args = self.args
+        outfiles = _outfiles(args.outdir, args.module, modname,
+                             result.is_package, args.format)
+        if result.outputs is None and modname in self._from_checkpoint:
+            note = "(documented before resuming)"
+            self.resumed += 1
+        elif result.outputs is None:
+            note = "(up to date)"
+            self.up_to_date += 1
+        else:
+            note = None
+        if not args.quiet:
+            if note is None:
+                print(' ', nice_path(result.filename), '->',
+                      ', '.join(outfiles))
+            else:
+                print(' ', nice_path(result.filename), '->',
+                      ', '.join(outfiles), note)
+
+        if result.outputs is None:
+            for outfile in outfiles:
+                self.writer.keep(outfile)
+        else:
+            with self.measure('write', 'phase'):
+                for name, outfile in zip(args.format, outfiles):
+                    self.writer.write(outfile, result.outputs[name])
+            if self.manifest is not None:
+                self.manifest.record(
+                    modname, result.filename, result.is_package, outfiles,
+                    result.submodules, result.files, result.path,
+                    result.exports, result.symbols, result.seconds)
+        entries = None
+        if self.index is not None:
+            if result.index is None:
+                path, entries = self.old_index[modname]
+            else:
+                entries = result.index
+            self.index.add(modname, _index_path(args.outdir, outfiles),
+                           entries)
+        self.known[modname] = (outfiles, _slim(result))
+        self.limited.extend(result.limited)
+        self.documented += 1
+
+        if self.checkpoint is not None:
+            self._unflushed.append((modname, {
+                'filename': result.filename,
+                'is_package': result.is_package,
+                'submodules': list(result.submodules),
+                'files': list(result.files),
+                'path': list(result.path),
+                'exports': list(result.exports),
+                'index': entries,
+                'symbols': list(result.symbols),
+                'limited': list(result.limited),
+                'seconds': result.seconds,
+            }))
+            if self.checkpoint.needs_saving():
+                self.save_checkpoint()
+
+    def save_checkpoint(self):
+        """Save the modules whose files have been written."""
+        self.writer.flush()
+        for modname, info in self._unflushed:
+            self.checkpoint.done(modname, info)
+        self._unflushed.clear()
+        self.checkpoint.save()
+
+
+def _build(args, pool=None, ir_modules=None, stream=None):
+    """Write the documentation of `args.module` to `args.outdir`.
+
+    *pool* is a process pool created by `_make_pool()`, and it can be
+    shared by many calls. *ir_modules* comes from --from-ir, and
+    *stream* is the file object that `--outdir -` writes to. This
+    returns a `_Stats` object.
+    """
     if not args.quiet:
         print("Writing documentation...")
 
-    documented = 0
     undocumented = []
-    module_queue = collections.deque([args.module])
-    while module_queue:
-        modname = module_queue.popleft()
-        module = importlib.import_module(modname)
-        if modname == args.module:
-            # 'fooproject' -> 'outdir/README.md'
-            outfile = os.path.join(args.outdir, 'README.md')
-        elif hasattr(module, '__path__'):
-            # It's a package.
-            # 'fooproject.bar.baz' -> 'outdir/bar/baz/README.md'
-            parts = [args.outdir] + modname.split('.')[1:] + ['README.md']
-            outfile = os.path.join(*parts)
+    limits = bananadoc.datarepr.Limits(
+        args.repr_length, args.repr_items, args.repr_time)
+    bananadoc.datarepr.limits = limits
+    fingerprint = bananadoc.manifest.hooks_fingerprint(
+        args.module, args.static, args.link_reexports, args.format, limits)
+    # Shards always have a manifest, because bananadoc merge needs it.
+    # When resuming, the modules from the checkpoint are not recorded
+    # again, so the manifest saved by the interrupted run is needed.
+    if args.incremental or args.shard is not None:
+        manifest = bananadoc.manifest.Manifest(
+            args.outdir, fingerprint,
+            load=(args.incremental or args.resume))
+    else:
+        manifest = None
+
+    failed = []         # [(modname, error message)]
+    if bananadoc.output.is_archive(args.outdir):
+        # Archives are always written from scratch.
+        checkpoint = None
+    else:
+        checkpoint = bananadoc.checkpoint.Checkpoint(
+            args.outdir, fingerprint, resume=args.resume)
+        if args.resume and not args.quiet:
+            if len(checkpoint) == 0:
+                print("There's no checkpoint to resume from, so everything "
+                      "will be documented.")
+            else:
+                print("Resuming, %s %s documented before."
+                      % (_plural(len(checkpoint), 'module'),
+                         'was' if len(checkpoint) == 1 else 'were'))
+
+    if args.link_reexports:
+        if args.static:
+            is_documented = bananadoc.static.is_documented
         else:
-            # 'fooproject.bar.baz' -> 'outdir/bar/baz.md'
-            parts = modname.split('.')[1:]
-            outfile = os.path.join(args.outdir, *parts) + '.md'
-        if not args.quiet:
-            print(' ', nice_path(module.__file__), '->', outfile)
+            is_documented = bananadoc.parse.is_documented
+        registry = bananadoc.links.Registry(args.module, functools.partial(
+            is_documented, args.module, submodules=not args.no_submodules))
+    else:
+        registry = None
 
-        mainsection, subs = bananadoc.parse_module(modname)
-        if not args.no_submodules:
-            module_queue.extend(subs)
+    if args.no_search_index:
+        index = None
+        old_index = {}
+    else:
+        index = bananadoc.search.IndexWriter()
+        if args.incremental:
+            old_index = bananadoc.search.load_modules(args.outdir)
         else:
-            undocumented.extend(subs)
-        with mkdir_open(outfile, 'w') as f:
-            mainsection.dump(f)
-        documented += 1
+            old_index = {}
+
+    extensions = [bananadoc.renderers.get_renderer(name).extension
+                  for name in args.format]
+    if bananadoc.output.is_archive(args.outdir):
+        writer = bananadoc.output.ArchiveWriter(args.outdir, stream)
+    elif args.sync:
+        writer = bananadoc.output.SyncWriter(args.outdir, extensions,
+                                             args.write_threads)
+    else:
+        writer = bananadoc.output.DirectoryWriter(args.outdir,
+                                                  args.write_threads)
+
+    if args.profile is None:
+        profiler = None
+        measure = _dont_measure
+    else:
+        profiler = bananadoc.profiling.Profiler()
+        profiler.install()
+        measure = profiler.measure
+
+    state = _BuildState(args, writer, manifest, checkpoint, registry, index,
+                        old_index, measure)
+
+    if args.shard is None:
+        shard_modules = None
+        shard_ir = None
+    else:
+        # Every shard finds the same modules in the same order.
+        number, count = args.shard
+        found = bananadoc.shard.discover(args.module, args.static,
+                                         not args.no_submodules)
+        weights = bananadoc.shard.weights(
+            found, bananadoc.manifest.timings(args.shard_timings
+                                              or args.outdir))
+        ours = bananadoc.shard.assign(weights, count)[number - 1]
+        shard_modules = [modname for modname, filename in found
+                         if modname in ours]
+        os.makedirs(args.outdir, exist_ok=True)
+        shard_ir = bananadoc.ir.Writer(
+            os.path.join(args.outdir, bananadoc.shard.IR_FILENAME),
+            args.module)
+
+    if args.emit_ir is None:
+        ir_writer = None
+    else:
+        ir_writer = bananadoc.ir.Writer(args.emit_ir, args.module)
+
+    if args.from_ir is not None:
+        def document(modname):
+            module = ir_modules[modname]
+            submodules = []
+            for sub in module.submodules:
+                # The IR file may have been written with --no-submodules.
+                if sub in ir_modules:
+                    submodules.append(sub)
+                else:
+                    undocumented.append(sub)
+            return _Documented(
+                filename=module.filename, is_package=module.is_package,
+                outputs=None, submodules=submodules, files=[], path=[],
+                exports=[], tree=module.tree, index=None,
+                symbols=module.symbols, targets=None, limited=[],
+                seconds=None)
+
+    elif pool is not None:
+        # A shard knows its modules already, and the submodules may be
+        # in other shards.
+        documenter = _ParallelDocumenter(
+            pool, args.static,
+            not args.no_submodules and shard_modules is None,
+            lambda modname: state.lookup(modname) is not None,
+            args.format,
+            tree=(args.isolate or ir_writer is not None), limits=limits)
+        if shard_modules is not None:
+            documenter.prefetch(shard_modules)
+        document = documenter.document
+    else:
+        document = functools.partial(
+            _document, static=args.static, registry=registry,
+            profiler=profiler, tree=(ir_writer is not None),
+            formats=args.format)
+
+    symbols = bananadoc.links.SymbolTable()
+    sources = {}        # {path in symbols: source file}
+    unresolved = []     # [(modname, dotted name)]
+
+    completed = False
+    try:
+        if shard_modules is None:
+            module_queue = collections.deque([args.module])
+        else:
+            module_queue = collections.deque(shard_modules)
+        # Modules with references to things that are not documented yet
+        # are rendered when everything else is done.
+        deferred = []   # [(modname, result, section, linked)]
+        while module_queue:
+            modname = module_queue.popleft()
+            try:
+                result = state.lookup(modname) or document(modname)
+            except Exception as e:
+                if not args.keep_going:
+                    raise
+                message = '%s: %s' % (type(e).__name__, e)
+                if not args.quiet:
+                    print(' ', modname, '-> FAILED,', message)
+                failed.append((modname, message))
+                if checkpoint is not None:
+                    checkpoint.fail(modname, message)
+                continue
+            linkpath = bananadoc.links.module_path(
+                args.module, modname, result.is_package)
+            symbols.add(linkpath, result.symbols)
+            sources[linkpath] = os.path.abspath(result.filename)
+            if args.no_submodules:
+                undocumented.extend(result.submodules)
+            elif shard_modules is None:
+                module_queue.extend(result.submodules)
+
+            if result.tree is None:
+                state.finish(modname, result)
+                continue
+            if ir_writer is not None:
+                ir_writer.add(bananadoc.ir.Module(
+                    modname, result.filename, result.is_package,
+                    result.submodules, result.tree, result.symbols))
+            with measure('render', 'phase'):
+                section = bananadoc.ir.unflatten(result.tree)
+                linked = set()
+                if symbols.resolve(section, linkpath, linked):
+                    deferred.append((modname, result, section, linked))
+                    continue
+                result = _render_tree(result, section, args.format)
+            state.finish(modname, _add_linked_files(result, linked, sources))
+
+        for modname, result, section, linked in deferred:
+            linkpath = bananadoc.links.module_path(
+                args.module, modname, result.is_package)
+            with measure('render', 'phase'):
+                names = symbols.resolve(section, linkpath, linked)
+                if names and shard_ir is not None:
+                    # The names may be in other shards.
+                    _defer_to_merge(args, modname, result, section,
+                                    shard_ir, manifest)
+                    state.documented += 1
+                    continue
+                unresolved.extend((modname, name) for name in names)
+                result = _render_tree(result, section, args.format)
+            state.finish(modname, _add_linked_files(result, linked, sources))
+        if index is not None:
+            # The writer knows how to put it in an archive.
+            writer.write(os.path.join(args.outdir, bananadoc.search.FILENAME),
+                         index.dumps())
+        writer.close()
+        completed = True
+    finally:
+        if checkpoint is not None:
+            if completed and not failed:
+                checkpoint.remove()
+            else:
+                try:
+                    state.save_checkpoint()
+                except Exception:
+                    # The files of the unflushed modules may be missing,
+                    # so they will be documented again when resuming.
+                    checkpoint.save()
+        if ir_writer is not None:
+            ir_writer.close()
+        if shard_ir is not None:
+            shard_ir.close()
+        if manifest is not None:
+            manifest.save()
+        if profiler is not None:
+            profiler.uninstall()
+
+    if args.shard is not None:
+        bananadoc.shard.write_info(args.outdir, {
+            'root': args.module,
+            'shard': list(args.shard),
+            'formats': args.format,
+            'fingerprint': manifest.fingerprint,
+            'outdir': args.outdir,
+            'modules': shard_modules,
+        })
 
     if not args.quiet:
         print()
-        if documented == 1:
+        if state.documented == 1:
             print("1 module was documented.")
         else:
-            print(documented, "modules were documented.")
+            print(state.documented, "modules were documented.")
+        if state.up_to_date:
+            print(state.up_to_date,
+                  "of them didn't change since the previous run.")
+        if state.resumed:
+            print(state.resumed, "of them were documented before resuming.")
+        if args.isolate and args.batch is None:
+            _print_workers(pool)
+        if args.sync:
+            print("%d files written, %d unchanged, %d removed."
+                  % (writer.written, writer.unchanged, writer.removed))
         if undocumented:
             if len(undocumented) == 1:
                 print("This submodule was NOT documented:")
             else:
                 print("These submodules were NOT documented:")
             table(undocumented)
+        if failed:
+            if len(failed) == 1:
+                print("This module could NOT be documented:")
+            else:
+                print("These modules could NOT be documented:")
+            for modname, message in failed:
+                print(" ", modname + ":", message)
+        if state.limited:
+            if len(state.limited) == 1:
+                print("This value was shortened:")
+            else:
+                print("These values were shortened:")
+            for fullname, problems in state.limited:
+                print(" ", fullname, "(%s)" % ', '.join(problems))
+
+    broken = None
+    if args.check_links:
+        broken = []
+        for modname, (outfiles, result) in state.known.items():
+            if result.targets is None:
+                # It was up to date, so it wasn't rendered.
+                continue
+            linkpath = bananadoc.links.module_path(
+                args.module, modname, result.is_package)
+            broken.extend('%s: %s' % (modname, target) for target in
+                          sorted(set(symbols.broken_links(linkpath,
+                                                          result.targets))))
+        broken.extend('%s: [%s]' % pair for pair in unresolved)
+        print()
+        if broken:
+            print("These links are broken:")
+            for line in broken:
+                print(" ", line)
+        else:
+            print("All links are OK.")
+
+    if profiler is not None:
+        print()
+        for line in profiler.summary(args.profile):
+            print(line)
+        if args.profile_trace is not None:
+            profiler.write_trace(args.profile_trace)
+            print()
+            print("The trace was written to %s." % args.profile_trace)
+
+    if args.watch:
+        # SyncWriter doesn't touch files that didn't change.
+        _watch(args, state.known, document,
+               bananadoc.output.SyncWriter(args.outdir, extensions,
+                                           args.write_threads),
+               manifest, index, symbols)
+
+    return _Stats(state.documented, state.up_to_date, state.resumed,
+                  undocumented, state.limited, broken, failed)
+
+
+def _defer_to_merge(args, modname, result, section, shard_ir, manifest):
+    """Leave rendering a module of a shard to `bananadoc merge`."""
+    outfiles = _outfiles(args.outdir, args.module, modname,
+                         result.is_package, args.format)
+    if not args.quiet:
+        print(' ', nice_path(result.filename), '->', ', '.join(outfiles),
+              "(bananadoc merge will write this)")
+    shard_ir.add(bananadoc.ir.Module(
+        modname, result.filename, result.is_package, result.submodules,
+        bananadoc.ir.flatten(section), result.symbols))
+    manifest.record(modname, result.filename, result.is_package, outfiles,
+                    result.submodules, result.files, result.path,
+                    result.exports, result.symbols, result.seconds)
+
+
+def _print_workers(pool):
+    if pool.started_workers == 1:
+        print("1 worker process was used.")
+    else:
+        print(pool.started_workers, "worker processes were used.")
+
+
+def _make_pool(args):
+    """Create the process pool that --isolate or --jobs wants, or None."""
+    if args.isolate:
+        if args.worker_memory is None:
+            max_memory = None
+        else:
+            max_memory = args.worker_memory * 1024 * 1024
+        # The workers are started with the spawn method, so they get
+        # the current sys.path automatically.
+        return bananadoc.workers.IsolatedPool(
+            args.jobs, args.worker_modules, max_memory, args.timeout)
+    if args.jobs > 1:
+        return concurrent.futures.ProcessPoolExecutor(
+            args.jobs, initializer=_init_worker, initargs=(sys.path,))
+    return None
+
+
+def _read_batch(path, outdir):
+    """Read a batch file and return a list of `(module, outdir)` pairs.
+
+    Each line of the file contains a module name and optionally an
+    output directory that defaults to the module name in *outdir*.
+    Empty lines and comments that start with `#` are ignored. This
+    raises ValueError if the file is not valid.
+    """
+    roots = []
+    with open(path, 'r', encoding='utf-8') as file:
+        for lineno, line in enumerate(file, start=1):
+            words = line.split('#')[0].split()
+            if not words:
+                continue
+            if len(words) > 2:
+                raise ValueError("%s:%d: expected a module name and an "
+                                 "optional output directory"
+                                 % (path, lineno))
+            if len(words) == 1:
+                words.append(os.path.join(outdir, words[0]))
+            roots.append(tuple(words))
+    if not roots:
+        raise ValueError("%s doesn't contain any modules" % path)
+
+    seen = {}
+    for module, root_outdir in roots:
+        key = os.path.normcase(os.path.abspath(root_outdir))
+        if key in seen:
+            raise ValueError("%s and %s would be written to %s"
+                             % (seen[key], module, root_outdir))
+        seen[key] = module
+    return roots
+
+
+def _plural(count, word):
+    if count == 1:
+        return '1 ' + word
+    return '%d %ss' % (count, word)
+
+
+def _build_all(args, roots, ir_modules=None, stream=None):
+    """Call `_build()` for each `(module, outdir)` pair in *roots*.
+
+    The modules share the same process pool and everything that has been
+    imported. With --batch, a summary of all modules is printed at the
+    end.
+    """
+    pool = _make_pool(args)
+    results = []
+    try:
+        for module, outdir in roots:
+            root_args = argparse.Namespace(**vars(args))
+            root_args.module = module
+            root_args.outdir = outdir
+            if args.batch is not None and not args.quiet:
+                print("Documenting %s..." % module)
+            results.append(_build(root_args, pool, ir_modules, stream))
+            if args.batch is not None and not args.quiet:
+                print()
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+    # With --keep-going, failures are reported after everything else.
+    failed = any(stats.failed for stats in results)
+    if args.batch is None or args.quiet:
+        if failed:
+            sys.exit(1)
+        return
+    print("Summary of %s:" % _plural(len(roots), 'package'))
+    for (module, outdir), stats in zip(roots, results):
+        parts = [_plural(stats.documented, 'module')]
+        if stats.up_to_date:
+            parts.append('%d up to date' % stats.up_to_date)
+        if stats.resumed:
+            parts.append('%d resumed' % stats.resumed)
+        if stats.undocumented:
+            parts.append(_plural(len(stats.undocumented), 'submodule')
+                         + ' NOT documented')
+        if stats.limited:
+            parts.append(_plural(len(stats.limited), 'value')
+                         + ' shortened')
+        if stats.broken:
+            parts.append(_plural(len(stats.broken), 'broken link'))
+        if stats.failed:
+            parts.append('%d FAILED' % len(stats.failed))
+        print(' ', module, '->', outdir + ':', ', '.join(parts))
+    print()
+    documented = sum(stats.documented for stats in results)
+    up_to_date = sum(stats.up_to_date for stats in results)
+    resumed = sum(stats.resumed for stats in results)
+    if documented == 1:
+        print("1 module was documented.")
+    else:
+        print(documented, "modules were documented.")
+    if up_to_date:
+        print(up_to_date, "of them didn't change since the previous run.")
+    if resumed:
+        print(resumed, "of them were documented before resuming.")
+    if args.isolate:
+        _print_workers(pool)
+    if failed:
+        sys.exit(1)
+
+
+_desc = "Generate documentation from Python docstrings."
+_epilog = ("Run 'bananadoc query --help' to see how to search the output, "
+           "'bananadoc serve --help' for rendering documentation on "
+           "demand and 'bananadoc merge --help' for combining shards.")
+
+
+def main():
+    """Run the command-line interface.
+
+    This uses `sys.argv` and may use `sys.exit`.
+    """
+    if sys.argv[1:2] == ['query']:
+        _query(sys.argv[2:])
+        return
+    if sys.argv[1:2] == ['serve']:
+        _serve(sys.argv[2:])
+        return
+    if sys.argv[1:2] == ['merge']:
+        _merge(sys.argv[2:])
+        return
+
+    parser = argparse.ArgumentParser(description=_desc, epilog=_epilog)
+    parser.add_argument(
+        'module', nargs='?',
+        help="name of the module that will be documented")
+    parser.add_argument(
+        '-q', '--quiet', action='store_true', help="produce less output")
+    parser.add_argument(
+        '-y', '--yes', action='store_true',
+        help="assume yes instead of asking questions")
+    parser.add_argument(
+        '--no-submodules', action='store_true',
+        help="don't document submodules recursively")
+    parser.add_argument(
+        '--static', action='store_true',
+        help="read the source files instead of importing the modules")
+    parser.add_argument(
+        '--link-reexports', action='store_true',
+        help=("document each class and function once, and link to that "
+              "when it's exported from other modules"))
+    parser.add_argument(
+        '-i', '--incremental', action='store_true',
+        help=("keep the output directory and don't document modules "
+              "that haven't changed since the previous run"))
+    parser.add_argument(
+        '--sync', action='store_true',
+        help=("keep the output directory, write only files that changed "
+              "and remove files from previous runs that are no longer "
+              "needed"))
+    parser.add_argument(
+        '-k', '--keep-going', action='store_true',
+        help=("if a module can't be documented, report the error at the "
+              "end and document the other modules anyway"))
+    parser.add_argument(
+        '--resume', action='store_true',
+        help=("keep the output directory and document only the modules "
+              "that the previous run didn't finish or failed to document"))
+    parser.add_argument(
+        '-w', '--watch', action='store_true',
+        help=("keep running and document modules again when their "
+              "source files change"))
+    parser.add_argument(
+        '--watch-interval', type=float, default=1, metavar='SECONDS',
+        help="check for changes this often, defaults to %(default)s")
+    parser.add_argument(
+        '-j', '--jobs', type=int, default=1, metavar='N',
+        help="document N modules at a time in separate processes")
+    parser.add_argument(
+        '--isolate', action='store_true',
+        help=("import and parse the modules in worker processes that are "
+              "replaced with new processes regularly"))
+    parser.add_argument(
+        '--worker-modules', type=int, default=100, metavar='N',
+        help=("with --isolate, replace a worker after it has documented "
+              "N modules, defaults to %(default)s"))
+    parser.add_argument(
+        '--worker-memory', type=int, metavar='MB',
+        help=("with --isolate, replace a worker when it has used more "
+              "than MB megabytes of memory"))
+    parser.add_argument(
+        '--timeout', type=float, metavar='SECONDS',
+        help=("with --isolate, give up if importing and parsing a module "
+              "takes longer than this"))
+    parser.add_argument(
+        '--write-threads', type=int, default=4, metavar='N',
+        help=("write output files in N background threads, 0 means "
+              "writing them in the main thread, defaults to %(default)s"))
+    parser.add_argument(
+        '--profile', type=int, nargs='?', const=15, metavar='N',
+        help=("measure how long everything takes and show the N slowest "
+              "things, N defaults to %(const)s"))
+    parser.add_argument(
+        '--profile-trace', metavar='FILE',
+        help="with --profile, also write a Chrome trace event file")
+    parser.add_argument(
+        '-f', '--format', action='append',
+        help=("output format, e.g. markdown, html or json, this can be "
+              "given many times to write many formats at once, defaults "
+              "to markdown"))
+    parser.add_argument(
+        '--check-links', action='store_true',
+        help=("report links to anchors that don't exist and [dotted.name] "
+              "references that can't be resolved"))
+    parser.add_argument(
+        '--repr-length', type=int, metavar='N',
+        default=bananadoc.datarepr.DEFAULT_LIMITS.length,
+        help=("cut reprs of data to N characters, "
+              "defaults to %(default)s"))
+    parser.add_argument(
+        '--repr-items', type=int, metavar='N',
+        default=bananadoc.datarepr.DEFAULT_LIMITS.items,
+        help=("show containers with more than N items like "
+              "'<dict with 1,234 items>', defaults to %(default)s"))
+    parser.add_argument(
+        '--repr-time', type=float, metavar='SECONDS',
+        default=bananadoc.datarepr.DEFAULT_LIMITS.seconds,
+        help=("give up on reprs of data that take longer than this, "
+              "defaults to %(default)s"))
+    parser.add_argument(
+        '--no-search-index', action='store_true',
+        help=("don't write the search index that "
+              "'bananadoc query' uses"))
+    parser.add_argument(
+        '--emit-ir', metavar='FILE',
+        help=("also write the parsed documentation to an IR file, "
+              "compressed if FILE ends with .gz"))
+    parser.add_argument(
+        '--from-ir', metavar='FILE',
+        help=("write documentation from an IR file instead of importing "
+              "anything, the module name is not needed"))
+    parser.add_argument(
+        '--shard', metavar='I/N',
+        help=("document only the modules in shard I of N, and use "
+              "'bananadoc merge' to combine the shards"))
+    parser.add_argument(
+        '--shard-timings', metavar='DIR',
+        help=("split the modules into shards using the times in the "
+              "manifest of DIR, defaults to OUTDIR"))
+    parser.add_argument(
+        '--batch', metavar='FILE',
+        help=("document the modules listed in FILE in one run, each line "
+              "is a module name and optionally an output directory, "
+              "which defaults to OUTDIR/MODULE"))
+    parser.add_argument(
+        '-o', '--outdir', default=os.path.join('docs', 'reference'),
+        help=("write output files here, defaults to %(default)s, can be a "
+              ".zip, .tar or .tar.gz file or - for a tar file to stdout"))
+
+    args = parser.parse_args()
+    if args.format is None:
+        args.format = ['markdown']
+    else:
+        # -f html -f html would write everything twice.
+        args.format = list(collections.OrderedDict.fromkeys(args.format))
+    if args.jobs < 1:
+        parser.error("the number of jobs must be positive")
+    if args.write_threads < 0:
+        parser.error("the number of write threads must not be negative")
+    if args.worker_modules < 1:
+        parser.error("the number of modules per worker must be positive")
+    if args.repr_length < 10:
+        parser.error("the repr length must be at least 10")
+    if args.repr_items < 0:
+        parser.error("the number of repr items must not be negative")
+    if args.repr_time <= 0:
+        parser.error("the repr time must be positive")
+    if args.worker_memory is not None or args.timeout is not None:
+        args.isolate = True
+    if args.isolate:
+        workers = "--isolate"
+    elif args.jobs > 1:
+        workers = "--jobs"
+    else:
+        workers = None
+    if args.watch and workers is not None:
+        parser.error("--watch and %s cannot be used together" % workers)
+    if args.link_reexports and workers is not None:
+        # The worker processes would need to know what the other
+        # processes have documented.
+        parser.error("--link-reexports and %s cannot be used together"
+                     % workers)
+    if args.profile_trace is not None and args.profile is None:
+        args.profile = 15
+    if args.profile is not None and workers is not None:
+        parser.error("--profile and %s cannot be used together" % workers)
+    if args.emit_ir is not None:
+        # Modules that are up to date or documented again wouldn't be
+        # in the IR file correctly.
+        for option, given in [('--incremental', args.incremental),
+                              ('--resume', args.resume),
+                              ('--watch', args.watch)]:
+            if given:
+                parser.error("--emit-ir and %s cannot be used together"
+                             % option)
+    if args.shard is not None:
+        try:
+            args.shard = bananadoc.shard.parse_spec(args.shard)
+        except ValueError as e:
+            parser.error(str(e))
+        # The shards must document exactly the same modules, and
+        # bananadoc merge reads the output directories.
+        for option, given in [('--batch', args.batch is not None),
+                              ('--from-ir', args.from_ir is not None),
+                              ('--emit-ir', args.emit_ir is not None),
+                              ('--link-reexports', args.link_reexports),
+                              ('--watch', args.watch),
+                              ('a zip or tar file',
+                               bananadoc.output.is_archive(args.outdir))]:
+            if given:
+                parser.error("--shard and %s cannot be used together"
+                             % option)
+    elif args.shard_timings is not None:
+        parser.error("--shard-timings is useless without --shard")
+
+    ir_modules = None
+    if args.batch is not None:
+        for option, given in [('the module name', args.module is not None),
+                              ('--from-ir', args.from_ir is not None),
+                              ('--emit-ir', args.emit_ir is not None),
+                              ('--watch', args.watch),
+                              ('--outdir -', args.outdir == '-')]:
+            if given:
+                parser.error("--batch and %s cannot be used together"
+                             % option)
+        try:
+            roots = _read_batch(args.batch, args.outdir)
+        except (OSError, ValueError) as e:
+            parser.error(str(e))
+    elif args.from_ir is None:
+        if args.module is None:
+            parser.error("the module name is needed without --from-ir "
+                         "or --batch")
+    else:
+        # The IR file already contains everything that these would
+        # change.
+        for option, given in [('--static', args.static),
+                              ('--link-reexports', args.link_reexports),
+                              ('--incremental', args.incremental),
+                              ('--watch', args.watch),
+                              ('--emit-ir', args.emit_ir is not None),
+                              (workers, workers is not None)]:
+            if given:
+                parser.error("--from-ir and %s cannot be used together"
+                             % option)
+        try:
+            rootname, ir_modules = bananadoc.ir.load(args.from_ir)
+        except (OSError, ValueError) as e:
+            parser.error(str(e))
+        if args.module not in {None, rootname}:
+            parser.error("%s contains documentation of %s, not %s"
+                         % (args.from_ir, rootname, args.module))
+        args.module = rootname
+    if args.batch is None:
+        roots = [(args.module, args.outdir)]
+
+    for module, outdir in roots:
+        # We need to check for this here because .stuff would later turn
+        # into /stuff.
+        if not all(module.split('.')):
+            parser.error("invalid module name %r" % module)
+        if bananadoc.output.is_archive(outdir):
+            # These need the files from the previous run.
+            for option, given in [('--incremental', args.incremental),
+                                  ('--sync', args.sync),
+                                  ('--resume', args.resume),
+                                  ('--watch', args.watch)]:
+                if given:
+                    parser.error("%s needs an output directory, not a zip "
+                                 "or tar file" % option)
+
+    _add_cwd_to_path()
+
+    # The documented packages can add formats with
+    # bananadoc.renderers.renderer when they are imported.
+    unknown = [name for name in args.format
+               if name not in bananadoc.renderers._renderers]
+    if unknown and not args.static and ir_modules is None:
+        for module, outdir in roots:
+            try:
+                importlib.import_module(module)
+            except Exception:
+                # The error is shown when the module is documented.
+                pass
+        unknown = [name for name in unknown
+                   if name not in bananadoc.renderers._renderers]
+    if unknown:
+        parser.error("unknown format %r, choose from %s" % (
+            unknown[0], ', '.join(bananadoc.renderers._renderers)))
+
+    for module, outdir in roots:
+        # Archives are always overwritten.
+        if (os.path.exists(outdir) and not bananadoc.output.is_archive(outdir)
+                and not (args.incremental or args.sync or args.resume)):
+            # if --yes was given, leave it alone which is the default
+            if not args.yes:
+                if yesno("'%s' exists. Remove it?" % outdir, False):
+                    if os.path.isdir(outdir):
+                        shutil.rmtree(outdir)
+                    else:
+                        os.remove(outdir)
+
+    if args.outdir == '-':
+        # The tar file goes to stdout, so everything else goes to stderr.
+        stream = sys.stdout.buffer
+        with contextlib.redirect_stdout(sys.stderr):
+            _build_all(args, roots, ir_modules, stream)
+    else:
+        _build_all(args, roots, ir_modules)
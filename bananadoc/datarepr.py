@@ -0,0 +1,238 @@
+# Copyright (c) 2017 Akuli
+
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+"""Short representations of values for the "Other data" sections.
+
+Modules often contain big lookup tables, dicts of compiled regexes and
+other values whose repr is many megabytes long or takes a long time to
+compute. The data sections use [bananadoc.datarepr.bounded_repr] instead
+of `repr()`, so big containers are summarized like `<dict with 40,000
+items>`, long reprs are cut with `...` and reprs that take too long are
+given up on.
+
+The limits are in the module-level `limits` variable, and you can set
+it to a different [bananadoc.datarepr.Limits] object before documenting
+anything.
+"""
+
+import builtins
+import collections
+import itertools
+import re
+import reprlib
+import signal
+import threading
+import time
+
+
+__all__ = ['Limits', 'DEFAULT_LIMITS', 'limits', 'TOO_LONG', 'TOO_BIG',
+           'TOO_DEEP', 'TOO_SLOW', 'summarizer', 'bounded_repr']
+
+
+class Limits(collections.namedtuple('_Limits', 'length items seconds')):
+    """How short and fast the reprs must be.
+
+    *length* is the maximum number of characters in a repr, *items* is
+    the number of items in the biggest container that isn't summarized
+    and *seconds* is how long a repr can take or None for no time limit.
+    """
+
+    __slots__ = ()
+
+
+DEFAULT_LIMITS = Limits(length=200, items=50, seconds=1.0)
+limits = DEFAULT_LIMITS
+
+# These are the problems that bounded_repr() reports.
+TOO_LONG = 'too long'
+TOO_BIG = 'too big'
+TOO_DEEP = 'too deep'
+TOO_SLOW = 'too slow'
+
+# [(types, func)]
+_summarizers = []
+
+# Default reprs like <foo.Bar object at 0x7f...> change on every run.
+_ADDRESS_RE = re.compile(r' at 0x[0-9A-Fa-f]+')
+
+
+def summarizer(*types):
+    """Add a function that summarizes values of the given types.
+
+    This is supposed to be used as a decorator. The function is called
+    with a value and a [bananadoc.datarepr.Limits] object, and it should
+    return a short description of the value or None if the value is
+    small enough for a normal repr. For example:
+
+    ```python
+    @summarizer(numpy.ndarray)
+    def summarize_array(array, limits):
+        if array.size > limits.items:
+            return '<array with shape %r>' % (array.shape,)
+        return None
+    ```
+
+    Summarizers added later are tried first.
+    """
+    def inner(func):
+        _summarizers.append((types, func))
+        return func
+    return inner
+
+
+@summarizer(dict, list, tuple, set, frozenset, collections.deque)
+def _summarize_container(value, limits):
+    if len(value) > limits.items:
+        return '<%s with %s items>' % (type(value).__name__,
+                                        format(len(value), ','))
+    return None
+
+
+@summarizer(bytes, bytearray)
+def _summarize_bytes(value, limits):
+    if len(value) > limits.length:
+        return '<%s object with %s bytes>' % (type(value).__name__,
+                                               format(len(value), ','))
+    return None
+
+
+class _Timeout(Exception):
+    pass
+
+
+class _BoundedRepr(reprlib.Repr):
+
+    def __init__(self, limits):
+        super().__init__()
+        self.limits = limits
+        self.problems = set()
+        self.maxdict = self.maxlist = self.maxtuple = limits.items
+        self.maxset = self.maxfrozenset = self.maxdeque = limits.items
+        self.maxarray = limits.items
+        self.maxstring = self.maxlong = self.maxother = limits.length
+        if limits.seconds is None:
+            self._deadline = None
+        else:
+            self._deadline = time.perf_counter() + limits.seconds
+
+    def repr1(self, x, level):
+        # This catches slow reprs of big nested things even where the
+        # alarm signal can't be used.
+        if self._deadline is not None and time.perf_counter() > self._deadline:
+            raise _Timeout
+        for types, func in reversed(_summarizers):
+            if isinstance(x, types):
+                summary = func(x, self.limits)
+                if summary is not None:
+                    self.problems.add(TOO_BIG)
+                    return summary
+        return super().repr1(x, level)
+
+    def repr_dict(self, x, level):
+        # reprlib sorts the keys, but repr() doesn't.
+        if not x:
+            return '{}'
+        if level <= 0:
+            self.problems.add(TOO_DEEP)
+            return '{%s}' % self.fillvalue
+        pieces = ['%s: %s' % (self.repr1(key, level - 1),
+                              self.repr1(x[key], level - 1))
+                  for key in itertools.islice(x, self.maxdict)]
+        if len(x) > self.maxdict:
+            pieces.append(self.fillvalue)
+        return '{%s}' % ', '.join(pieces)
+
+    def _repr_iterable(self, x, level, *args, **kwargs):
+        # reprlib shows non-empty containers nested more than maxlevel
+        # levels deep as [...], (...) etc.
+        if level <= 0 and len(x):
+            self.problems.add(TOO_DEEP)
+        return super()._repr_iterable(x, level, *args, **kwargs)
+
+    def repr_str(self, x, level):
+        if len(x) > self.maxstring:
+            self.problems.add(TOO_LONG)
+        return super().repr_str(x, level)
+
+    def repr_instance(self, x, level):
+        # reprlib uses builtins.repr() for everything it doesn't know,
+        # but this doesn't hide exceptions like reprlib would.
+        result = builtins.repr(x)
+        if len(result) > self.maxother:
+            self.problems.add(TOO_LONG)
+            result = result[:self.maxother - 3] + '...'
+        return result
+
+
+class _Alarm:
+    # Raise _Timeout in the main thread when the time is up. This
+    # interrupts slow __repr__ methods written in Python, and it does
+    # nothing in other threads or on Windows.
+
+    def __init__(self, seconds):
+        self._seconds = seconds
+        self._active = False
+
+    def _handler(self, signum, frame):
+        if self._active:
+            raise _Timeout
+
+    def __enter__(self):
+        self._enabled = (self._seconds is not None
+                         and hasattr(signal, 'setitimer')
+                         and threading.current_thread()
+                         is threading.main_thread())
+        if self._enabled:
+            self._old_handler = signal.signal(signal.SIGALRM, self._handler)
+            self._active = True
+            signal.setitimer(signal.ITIMER_REAL, self._seconds)
+
+    def __exit__(self, *error):
+        if self._enabled:
+            self._active = False
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, self._old_handler)
+
+
+def bounded_repr(value):
+    """Return a `(text, problems)` tuple.
+
+    *text* is like `repr(value)`, but it follows the module-level
+    `limits`. *problems* is a sorted list of the limits that the value
+    hit, or an empty list. It can contain `TOO_LONG`, `TOO_BIG`,
+    `TOO_DEEP` and `TOO_SLOW`.
+
+    Memory addresses like ` at 0x7f0123456789` are removed, so the text
+    is the same every time the documentation is written.
+    """
+    bounded = _BoundedRepr(limits)
+    try:
+        with _Alarm(limits.seconds):
+            text = bounded.repr(value)
+    except _Timeout:
+        bounded.problems.add(TOO_SLOW)
+        text = '<%s object, repr() took too long>' % type(value).__name__
+    text = _ADDRESS_RE.sub('', text)
+    if len(text) > limits.length:
+        bounded.problems.add(TOO_LONG)
+        text = text[:limits.length - 3] + '...'
+    return text, sorted(bounded.problems)
@@ -27,19 +27,12 @@ usually pointless. You may still want to read this module to see what
 bananadoc does by default.
 """
 
+import enum
 import functools
-import inspect
 import types
 
-try:
-    import enum
-except ImportError:
-    # We are running Python 3.3 without enum34, but we don't need to
-    # warn the user about this because the documented modules can't use
-    # enums either.
-    enum = None
-
 import bananadoc
+from bananadoc import datarepr
 
 
 __all__ = []
@@ -47,30 +40,51 @@ __all__ = []
 
 class DataSection(bananadoc.Section):
 
-    def __init__(self):
+    __slots__ = ('location', 'data', '_frozen')
+
+    def __init__(self, location):
         super().__init__("Other data")
+        self.location = location
         self.data = []
+        self._frozen = None     # (content, limited) after releasing
 
-    @property
-    def content(self):
+    def _compute(self):
         lines = ['```']
+        limited = []
         for name, value in self.data:
-            lines.append('%s = `%r`' % (name, value))
+            text, problems = datarepr.bounded_repr(value)
+            if problems:
+                limited.append(['%s.%s' % (self.location, name), problems])
+            lines.append('%s = `%s`' % (name, text))
         lines.append('```')
-        return '\n'.join(lines)
+        return '\n'.join(lines), limited
+
+    @property
+    def content(self):
+        return (self._frozen or self._compute())[0]
+
+    @property
+    def limited(self):
+        # A list of [fullname, problems] lists for values that hit the
+        # bananadoc.datarepr limits.
+        return (self._frozen or self._compute())[1]
 
     @content.setter
     def content(self, content):
         # bananadoc.Section.__init__ sets this.
         assert content is None
 
+    def release(self):
+        self._frozen = self._compute()
+        self.data = []
+
 
 @bananadoc.parsingfunc
 def parse_data(section, name, value):
     try:
         datasect = section._datasection
     except AttributeError:
-        datasect = section._datasection = DataSection()
+        datasect = section._datasection = DataSection(section.fullname)
     datasect.data.append((name, value))
     return True
 
@@ -79,44 +93,46 @@ def parse_data(section, name, value):
 # is, so we need this.
 @bananadoc.modulehook
 def add_datasections(section):
-    for sub in section.walk_subs():
+    # The list is needed because appending to the subs while walking
+    # them would also walk the new data sections.
+    for sub in [section] + list(section.walk_subs()):
         try:
-            sub.subs.append(section._datasection)
+            datasect = sub._datasection
         except AttributeError:   # no data section
-            pass
+            continue
+        del sub._datasection
+        sub.subs.append(datasect)
 
 
-@bananadoc.parsingfunc
+@bananadoc.parsingfunc(types.FunctionType)
 def parse_function(parentsect, name, value):
-    if not isinstance(value, types.FunctionType):
-        return False
-    if value.__doc__ is None:
+    doc = bananadoc.parse.getdoc(value)
+    if doc is None:
         raise bananadoc.NoDocstring(parentsect.fullname, name)
 
     # The title will be like thing(a, b, c).
     section = bananadoc.ObjectSection(
         parentsect.fullname, name, value,
-        title=name + str(inspect.signature(value)),
-        content=inspect.cleandoc(value.__doc__))
+        title=name + bananadoc.parse.getsignature(value),
+        content=doc)
     parentsect.subs.append(section)
     return True
 
 
-@bananadoc.parsingfunc
+@bananadoc.parsingfunc(property)
 def parse_property(parentsect, name, value):
-    if not isinstance(value, property):
-        return False
     if not isinstance(parentsect.value, type):
         # It's a property, but it's not in a class. Let's document it as
         # data instead.
         return False
-    if value.__doc__ is None:
+    doc = bananadoc.parse.getdoc(value)
+    if doc is None:
         raise bananadoc.NoDocstring(parentsect.fullname, name)
 
     sub = bananadoc.ObjectSection(
         parentsect.fullname, name, value,
         title="The %s property" % name,
-        content=inspect.cleandoc(value.__doc__))
+        content=doc)
     parentsect.subs.append(sub)
     return True
 
@@ -143,15 +159,12 @@ def _class_sorting_key(cls, name):
     return 5, name
 
 
-@bananadoc.parsingfunc
+@bananadoc.parsingfunc(type)
 def parse_class(parentsect, classname, cls):
-    if not isinstance(cls, type):
-        # It's not a class.
-        return False
-    if enum is not None:
-        assert not isinstance(cls, enum.EnumMeta), \
-               "the enum parser didn't parse %r" % (cls,)
-    if cls.__doc__ is None:
+    assert not isinstance(cls, enum.EnumMeta), \
+           "the enum parser didn't parse %r" % (cls,)
+    doc = bananadoc.parse.getdoc(cls)
+    if doc is None:
         raise bananadoc.NoDocstring(parentsect.fullname, classname)
 
     bases = []
@@ -170,16 +183,18 @@ def parse_class(parentsect, classname, cls):
     section = bananadoc.ObjectSection(
         parentsect.fullname, classname, cls,
         title="class %s" % displayname,
-        content=inspect.cleandoc(cls.__doc__))
+        content=doc)
     parentsect.subs.append(section)
 
     try:
         names = cls._bananadoc_all
     except AttributeError:
         # We need __dict__ because we don't want anything from parent
-        # classes.
-        names = [name for name in cls.__dict__
-                 if name == '__init__' or not name.startswith('_')]
+        # classes. Member descriptors come from __slots__ and they are
+        # attributes of instances, not something to document here.
+        names = [name for name, value in cls.__dict__.items()
+                 if (name == '__init__' or not name.startswith('_'))
+                 and not isinstance(value, types.MemberDescriptorType)]
         names.sort(key=functools.partial(_class_sorting_key, cls))
     for name in names:
         # We need __dict__ because we want real classmethod and
@@ -196,16 +211,14 @@ def parse_class(parentsect, classname, cls):
     return True
 
 
-if enum is not None:
-    @bananadoc.parsingfunc
-    def parse_enum(parentsect, name, value):
-        if not isinstance(value, enum.EnumMeta):
-            return False
-        if value.__doc__ is None:
-            raise bananadoc.NoDocstring(parentsect.fullname, name)
-        section = bananadoc.ObjectSection(
-            parentsect.fullname, name, value,
-            title="enum %s" % name,
-            content=inspect.cleandoc(value.__doc__))
-        parentsect.subs.append(section)
-        return True
+@bananadoc.parsingfunc(enum.EnumMeta)
+def parse_enum(parentsect, name, value):
+    doc = bananadoc.parse.getdoc(value)
+    if doc is None:
+        raise bananadoc.NoDocstring(parentsect.fullname, name)
+    section = bananadoc.ObjectSection(
+        parentsect.fullname, name, value,
+        title="enum %s" % name,
+        content=doc)
+    parentsect.subs.append(section)
+    return True
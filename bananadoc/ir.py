@@ -0,0 +1,168 @@
+# Copyright (c) 2017 Akuli
+
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""Section trees as plain data.
+
+A flattened section tree is a list of rows, one row for each section in
+the order they are dumped. Each row is a list like `[level, title,
+content, location, name]` where *level* is 0 for the top section, 1 for
+its subsections and so on. *location* and *name* are the
+[bananadoc.ObjectSection] attributes, and *name* is None for
+sections that are not ObjectSections.
+
+The rows contain only lists, strings, integers and None, so they can
+be pickled, converted to JSON and so on without importing the
+documented code.
+
+IR files contain the flattened trees of many modules. They are JSON
+lines files, and they are compressed with gzip if the file name ends
+with `.gz`. The first line looks like this:
+
+```
+{"format": "bananadoc-ir", "version": 2, "root": "the.documented.module"}
+```
+
+Each of the other lines is a JSON object with the
+[bananadoc.ir.Module] fields as keys.
+"""
+
+import collections
+import gzip
+import json
+
+from bananadoc import parse
+
+
+FORMAT = 'bananadoc-ir'
+VERSION = 2
+
+# filename is the source file, submodules is a list of names, tree is a
+# list of rows and symbols is a list from bananadoc.links.symbols().
+Module = collections.namedtuple(
+    'Module', 'name filename is_package submodules tree symbols')
+
+
+def flatten(section):
+    """Convert a section tree to a list of rows.
+
+    The *content* of each section is computed when flattening, so
+    sections with a content property work too.
+    """
+    rows = []
+    stack = [(section, 0)]
+    while stack:
+        sect, level = stack.pop()
+        if isinstance(sect, parse.ObjectSection):
+            location, name = sect.location, sect.name
+        else:
+            location = name = None
+        rows.append([level, sect.title, sect.content, location, name])
+        stack.extend((sub, level+1) for sub in reversed(sect.subs))
+    return rows
+
+
+def unflatten(rows):
+    """Convert rows back to a section tree and return the top section.
+
+    The *value* attributes of the ObjectSections are None because the
+    values are not saved.
+    """
+    parents = []
+    top = None
+    for level, title, content, location, name in rows:
+        if name is None:
+            section = parse.Section(title, content)
+        else:
+            section = parse.ObjectSection(location, name, None,
+                                          title=title, content=content)
+        del parents[level:]
+        if parents:
+            parents[-1].subs.append(section)
+        else:
+            assert top is None, "there are many top-level sections"
+            top = section
+        parents.append(section)
+    return top
+
+
+def _open(path, mode):
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+class Writer:
+    """Write modules to an IR file.
+
+    The modules are written as they are added with
+    [bananadoc.ir.Writer.add], so they don't need to be kept in memory.
+    Writers can be used in `with` statements, and they are closed when
+    the `with` block ends.
+    """
+
+    def __init__(self, path, rootname):
+        self._file = _open(path, 'w')
+        self._write_line({'format': FORMAT, 'version': VERSION,
+                          'root': rootname})
+
+    def _write_line(self, obj):
+        self._file.write(json.dumps(obj, separators=(',', ':')) + '\n')
+
+    def add(self, module):
+        """Write a [bananadoc.ir.Module] to the file."""
+        self._write_line(module._asdict())
+
+    def close(self):
+        """Close the file."""
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *error):
+        self.close()
+
+
+def load(path):
+    """Read an IR file.
+
+    This returns a `(rootname, modules)` tuple where *modules* is an
+    ordered dict with module names as keys and [bananadoc.ir.Module]
+    objects as values. ValueError is raised if the file isn't an IR
+    file or it has a different version.
+    """
+    with _open(path, 'r') as file:
+        try:
+            header = json.loads(file.readline())
+        except ValueError:
+            header = None
+        if not isinstance(header, dict) or header.get('format') != FORMAT:
+            raise ValueError("%s is not a BananaDoc IR file" % path)
+        if header.get('version') != VERSION:
+            raise ValueError("%s has IR version %s, but version %d is "
+                             "supported" % (path, header.get('version'),
+                                            VERSION))
+
+        modules = collections.OrderedDict()
+        for line in file:
+            module = Module(**json.loads(line))
+            modules[module.name] = module
+    return header['root'], modules
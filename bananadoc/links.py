@@ -0,0 +1,377 @@
+# Copyright (c) 2017 Akuli
+
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""Links between the generated Markdown files."""
+
+import posixpath
+import re
+import types
+
+from bananadoc import parse
+
+
+def module_path(rootname, modname, is_package):
+    """Return the path of a module's Markdown file in the output directory.
+
+    The path uses `/` as the separator and is relative to the output
+    directory.
+    """
+    if modname == rootname:
+        # 'fooproject' -> 'README.md'
+        return 'README.md'
+    parts = modname.split('.')[1:]
+    if is_package:
+        # 'fooproject.bar.baz' -> 'bar/baz/README.md'
+        return '/'.join(parts + ['README.md'])
+    # 'fooproject.bar.baz' -> 'bar/baz.md'
+    return '/'.join(parts) + '.md'
+
+
+def relative_link(frompath, topath, anchor=None):
+    """Return a link from one file in the output directory to another.
+
+    Both paths should be like [bananadoc.links.module_path] returns.
+    """
+    if frompath == topath:
+        link = ''
+    else:
+        link = posixpath.relpath(topath, posixpath.dirname(frompath) or '.')
+    if anchor is not None:
+        link += '#' + anchor
+    return link
+
+
+def anchor(title):
+    """Convert a section title to an anchor like GitHub does it.
+
+    For example, `class Section` becomes `class-section`. If the same
+    title appears many times in a file, use [bananadoc.links.Anchors]
+    instead.
+    """
+    result = re.sub(r'[^\w\- ]', '', title.strip().lower())
+    return result.replace(' ', '-')
+
+
+class Anchors:
+    """Create unique anchors for the titles of one file like GitHub.
+
+    GitHub adds `-1`, `-2` and so on to anchors that are already used in
+    the same file, so two methods called `run(self)` get `runself` and
+    `runself-1`.
+    """
+
+    def __init__(self):
+        self._counts = {}       # {anchor: how many times it was seen}
+
+    def add(self, title):
+        """Return the anchor of the next title in the file."""
+        base = result = anchor(title)
+        while result in self._counts:
+            self._counts[base] += 1
+            result = '%s-%d' % (base, self._counts[base])
+        self._counts[result] = 0
+        return result
+
+
+def anchors(section):
+    """Return a dict with sections of a tree as keys and anchors as values.
+
+    The *section* should be the top section of a file.
+    """
+    maker = Anchors()
+    return {sect: maker.add(sect.title)
+            for sect in [section] + list(section.walk_subs())}
+
+
+def canonical_name(obj):
+    """Return `(obj.__module__, obj.__qualname__)` or None.
+
+    Only classes and functions have canonical names, because other
+    objects don't know where they are defined.
+    """
+    if isinstance(obj, (type, types.FunctionType)):
+        return (obj.__module__, obj.__qualname__)
+    return None
+
+
+class _Entry:
+
+    def __init__(self, path, anchor, obj):
+        self.path = path
+        self.anchor = anchor
+        self.obj = obj
+
+
+class _StubSection(parse.ObjectSection):
+    """A short section that links to the documentation of an object."""
+
+
+class Registry:
+    """Remember which objects have been documented and where.
+
+    Each object is documented in the module that defines it, and other
+    modules that export it get a short section with a `[dotted.name]`
+    reference to the full documentation. *documented* should be a
+    function like `bananadoc.parse.is_documented()` without the
+    *rootname* argument, and it's used for checking whether the defining
+    module documents the object. If it doesn't, the object is documented
+    where it's first seen, and the later sections link to that.
+    """
+
+    def __init__(self, rootname, documented=None):
+        self.rootname = rootname
+        self.documented = documented
+        self._entries = {}      # {canonical name: _Entry}
+        # The anchors depend on the other titles of the file, so they
+        # are found out when the module is done.
+        self._mainsection = None
+        self._unfinished = []   # [(_Entry, section)]
+
+    def _finish(self):
+        if self._unfinished:
+            anchors_ = anchors(self._mainsection)
+            for entry, section in self._unfinished:
+                entry.anchor = anchors_[section]
+            self._unfinished.clear()
+        self._mainsection = None
+
+    def exports(self, modname, is_package):
+        """Return a list of things that were documented in a module.
+
+        The list can be saved as JSON and given to
+        [bananadoc.links.Registry.restore] later.
+        """
+        self._finish()
+        path = module_path(self.rootname, modname, is_package)
+        return [[list(key), entry.anchor]
+                for key, entry in self._entries.items() if entry.path == path]
+
+    def restore(self, modname, is_package, exports):
+        """Register things like they were registered before.
+
+        This is useful when a module isn't documented again because it
+        didn't change.
+        """
+        path = module_path(self.rootname, modname, is_package)
+        for key, anchor_ in exports:
+            self._entries.setdefault(tuple(key), _Entry(path, anchor_, None))
+
+    def parse_object(self, mainsection, name, obj, parse_func, key=None):
+        """Document an object in a module's section unless it's known.
+
+        *parse_func* is called with no arguments if the object needs to
+        be documented. The *key* is [bananadoc.links.canonical_name] of
+        the object by default.
+        """
+        if key is None:
+            key = canonical_name(obj)
+        if mainsection is not self._mainsection:
+            self._finish()
+            self._mainsection = mainsection
+        is_package = hasattr(mainsection.value, '__path__')
+        path = module_path(self.rootname, mainsection.name, is_package)
+        modname, qualname = key or (None, None)
+        if (modname not in {None, mainsection.name}
+                and self.documented is not None
+                and self.documented(modname, qualname)):
+            mainsection.subs.append(_StubSection(
+                mainsection.fullname, name, obj, title=name,
+                content="See [%s]." % '.'.join(key)))
+            return
+
+        entry = None if key is None else self._entries.get(key)
+        # Restored entries don't have objects.
+        if entry is not None and (entry.obj is None or entry.obj is obj):
+            self._finish()
+            link = relative_link(path, entry.path, entry.anchor)
+            mainsection.subs.append(_StubSection(
+                mainsection.fullname, name, obj, title=name,
+                content="See [%s](%s)." % ('.'.join(key), link)))
+            return
+
+        before = len(mainsection.subs)
+        parse_func()
+        if key is not None and len(mainsection.subs) > before:
+            entry = self._entries[key] = _Entry(path, None, obj)
+            self._unfinished.append((entry, mainsection.subs[-1]))
+
+
+# Code blocks and code spans are split out because links in them are
+# not links.
+_CODE_RE = re.compile(r'(```.*?```|`[^`\n]*`)', re.DOTALL)
+# [some.dotted.name] that isn't a part of [text](link) or [text][ref]
+_REFERENCE_RE = re.compile(
+    r'(?<![\w\]\\])\[([A-Za-z_]\w*(?:\.[A-Za-z_]\w*)+)\](?![(\[:])')
+_LINK_RE = re.compile(r'\[[^\]]*\]\(([^)\s]+)\)')
+
+
+def _substitute(content, regex, function):
+    parts = _CODE_RE.split(content)
+    for index in range(0, len(parts), 2):
+        parts[index] = regex.sub(function, parts[index])
+    return ''.join(parts)
+
+
+def has_references(section):
+    """Check if a section tree contains `[dotted.name]` references."""
+    for sect in [section] + list(section.walk_subs()):
+        for index, part in enumerate(_CODE_RE.split(sect.content)):
+            if index % 2 == 0 and _REFERENCE_RE.search(part):
+                return True
+    return False
+
+
+def link_targets(section):
+    """Return a list of the link targets in a section tree's contents.
+
+    Links to other websites are not included.
+    """
+    result = []
+    for sect in [section] + list(section.walk_subs()):
+        for index, part in enumerate(_CODE_RE.split(sect.content)):
+            if index % 2 == 0:
+                result.extend(target for target in _LINK_RE.findall(part)
+                              if ':' not in target)
+    return result
+
+
+def symbols(mainsection, aliases=None):
+    """Return a list of `[name, anchor, is_alias]` lists for a module.
+
+    There's a list for each section. The name is the *fullname* of each
+    [bananadoc.ObjectSection] and None for other sections. A class or
+    function documented with another name, like `fooproject.Thing` for
+    `fooproject.things.Thing`, is also listed with its
+    [bananadoc.links.canonical_name] and a true *is_alias*, and so are
+    its methods. *aliases* is a `{name: canonical_name}` dict for the
+    objects in the module; by default, the canonical names come from the
+    *value* of each section.
+    """
+    result = []
+    anchors_ = Anchors()
+    # The sections come out of the stack in the order they are dumped.
+    stack = [(mainsection, None)]
+    while stack:
+        section, canonical = stack.pop()
+        anchor_ = anchors_.add(section.title)
+        if isinstance(section, parse.ObjectSection):
+            result.append([section.fullname, anchor_, False])
+            # A link to a stub would be a link to another link.
+            if (canonical is not None and canonical != section.fullname
+                    and not isinstance(section, _StubSection)):
+                result.append([canonical, anchor_, True])
+        else:
+            result.append([None, anchor_, False])
+
+        for sub in reversed(section.subs):
+            if not isinstance(sub, parse.ObjectSection):
+                sub_canonical = None
+            elif section is not mainsection:
+                sub_canonical = (None if canonical is None
+                                 else canonical + '.' + sub.name)
+            elif aliases is not None:
+                sub_canonical = aliases.get(sub.name)
+            else:
+                key = canonical_name(sub.value)
+                sub_canonical = None if key is None else '.'.join(key)
+            stack.append((sub, sub_canonical))
+    return result
+
+
+class SymbolTable:
+    """Find out where things are documented.
+
+    All lookups use dicts, so they are fast even with lots of symbols.
+    The paths are like [bananadoc.links.module_path] returns.
+    """
+
+    def __init__(self):
+        self._names = {}        # {fullname: (path, anchor)}
+        self._aliases = {}      # {canonical name: (path, anchor)}
+        self._anchors = {}      # {path: set of anchors}
+
+    def add(self, path, symbols_):
+        """Add a module's [bananadoc.links.symbols].
+
+        Adding the same path again replaces its anchors.
+        """
+        anchors = self._anchors[path] = set()
+        for name, anchor_, is_alias in symbols_:
+            anchors.add(anchor_)
+            if name is None:
+                continue
+            if is_alias:
+                self._aliases.setdefault(name, (path, anchor_))
+            else:
+                self._names[name] = (path, anchor_)
+
+    def lookup(self, name):
+        """Return a `(path, anchor)` tuple or None if *name* is unknown.
+
+        Documented names are preferred over canonical names, so a link
+        to a re-exported object points to the full documentation instead
+        of a short section from [bananadoc.links.Registry].
+        """
+        return self._names.get(name) or self._aliases.get(name)
+
+    def resolve(self, section, path, linked=None):
+        """Replace `[dotted.name]` references with links.
+
+        The contents of *section* and its subsections are changed, and
+        *path* is the file that the section tree is written to. This
+        returns a list of names that couldn't be resolved. They are left
+        alone, so this can be called again when more modules are known.
+        If *linked* is a set, the paths of the files that the new links
+        point to are added to it.
+        """
+        unresolved = []
+
+        def replace(match):
+            found = self.lookup(match.group(1))
+            if found is None:
+                unresolved.append(match.group(1))
+                return match.group(0)
+            if linked is not None:
+                linked.add(found[0])
+            return '%s(%s)' % (match.group(0), relative_link(path, *found))
+
+        for sect in [section] + list(section.walk_subs()):
+            sect.content = _substitute(sect.content, _REFERENCE_RE, replace)
+        return unresolved
+
+    def broken_links(self, path, targets):
+        """Return the [bananadoc.links.link_targets] that point nowhere.
+
+        Links to files that are not known are not checked, because they
+        may point to files that BananaDoc didn't create.
+        """
+        result = []
+        for target in targets:
+            file, junk, anchor_ = target.partition('#')
+            if file:
+                topath = posixpath.normpath(
+                    posixpath.join(posixpath.dirname(path), file))
+            else:
+                topath = path
+            anchors = self._anchors.get(topath)
+            if anchors is not None and anchor_ and anchor_ not in anchors:
+                result.append(target)
+        return result
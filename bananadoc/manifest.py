@@ -0,0 +1,327 @@
+# Copyright (c) 2017 Akuli
+
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""Remember what was documented to avoid doing it again.
+
+The manifest is a JSON file in the output directory. It contains a hash
+of each documented module's source file and the files it depends on,
+and a module doesn't need to be documented again if the hash is still
+the same.
+"""
+
+import ast
+import hashlib
+import importlib.util
+import inspect
+import json
+import os
+import sys
+import types
+
+import bananadoc
+from bananadoc import parse
+
+
+FILENAME = '.bananadoc-manifest.json'
+# Manifests with a different version are ignored.
+VERSION = 1
+
+
+def _hash_file(path, cache):
+    try:
+        return cache[path]
+    except KeyError:
+        pass
+    try:
+        with open(path, 'rb') as f:
+            result = hashlib.sha256(f.read()).hexdigest()
+    except OSError:
+        # This file was deleted, so the hash is different from whatever
+        # was saved.
+        result = None
+    cache[path] = result
+    return result
+
+
+def _listing(directories):
+    # New submodules may appear in packages without __all__, so the
+    # package's hash must change when they are added or removed.
+    result = []
+    for directory in directories:
+        try:
+            result.extend(sorted(os.listdir(directory)))
+        except OSError:
+            pass
+    return result
+
+
+def _hook_sources():
+    # Yields (func, source file or None) pairs for all hook functions.
+    for func in parse._parsingfuncs + parse._modulehooks:
+        try:
+            yield func, inspect.getsourcefile(func)
+        except TypeError:
+            yield func, None
+
+
+def hooks_fingerprint(*extra):
+    """Return a string that changes when bananadoc or its hooks change.
+
+    This includes the version of bananadoc and hashes of the source
+    files that define the [bananadoc.parsingfunc] and
+    [bananadoc.modulehook] functions. The *extra* arguments are
+    included as is.
+    """
+    cache = {}
+    parts = [bananadoc.__version__] + [str(thing) for thing in extra]
+    for func, filename in _hook_sources():
+        parts.append('%s.%s' % (func.__module__, func.__qualname__))
+        if filename is not None:
+            parts.append(_hash_file(filename, cache) or '')
+    return hashlib.sha256('\n'.join(parts).encode('utf-8')).hexdigest()
+
+
+# {filename: (stamp, [(module name, imported names)])}
+_import_cache = {}
+
+
+def _imports(filename):
+    # Returns the import statements of a source file as (base, names)
+    # pairs. The base is None for 'import x' and names is like ['x'].
+    try:
+        stat = os.stat(filename)
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        if _import_cache[filename][0] == stamp:
+            return _import_cache[filename][1]
+    except OSError:
+        return []
+    except KeyError:
+        pass
+    try:
+        with open(filename, 'rb') as f:
+            tree = ast.parse(f.read(), filename)
+    except (OSError, SyntaxError, ValueError):
+        return []
+    result = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            result.append((None, [alias.name for alias in node.names]))
+        elif isinstance(node, ast.ImportFrom):
+            base = '.' * node.level + (node.module or '')
+            result.append((base, [alias.name for alias in node.names]))
+    _import_cache[filename] = (stamp, result)
+    return result
+
+
+def _imported_modules(module):
+    # Returns names of the modules that a module's source imports, like
+    # 'pkg.consts' for 'from pkg.consts import TIMEOUT'.
+    filename = getattr(module, '__file__', None)
+    if filename is None or not filename.endswith('.py'):
+        return set()
+    package = getattr(module, '__package__', None) or ''
+    result = set()
+    for base, names in _imports(filename):
+        if base is None:
+            result.update(names)
+            continue
+        try:
+            base = importlib.util.resolve_name(base, package)
+        except (ImportError, ValueError):
+            # A relative import that goes too far up.
+            continue
+        for name in names:
+            if base + '.' + name in sys.modules:
+                result.add(base + '.' + name)
+            else:
+                result.add(base)
+    return result
+
+
+def dependencies(mainsection):
+    """Find the source files that the section tree of a module depends on.
+
+    This returns the files of the modules that define the documented
+    objects and their base classes, and the files of the modules that
+    the documented module imports, because data like `TIMEOUT = 5` may
+    come from them. Imports are followed into other modules of the same
+    top-level package.
+
+    The files that define [bananadoc.parsingfunc] and
+    [bananadoc.modulehook] functions are included too, because
+    documented packages often register them when they are imported,
+    which is too late for [bananadoc.manifest.hooks_fingerprint].
+    """
+    modnames = set()
+    for section in [mainsection] + list(mainsection.walk_subs()):
+        value = getattr(section, 'value', None)
+        if isinstance(value, property):
+            value = value.fget
+        if isinstance(value, type):
+            modnames.update(base.__module__ for base in value.__mro__)
+        elif isinstance(value, types.ModuleType):
+            modnames.add(value.__name__)
+        elif isinstance(getattr(value, '__module__', None), str):
+            modnames.add(value.__module__)
+
+    module = getattr(mainsection, 'value', None)
+    if isinstance(module, types.ModuleType):
+        root = module.__name__.partition('.')[0]
+        todo = [module]
+        seen = {module.__name__}
+        while todo:
+            for modname in _imported_modules(todo.pop()):
+                imported = sys.modules.get(modname)
+                if imported is None or modname in seen:
+                    continue
+                seen.add(modname)
+                modnames.add(modname)
+                if modname.partition('.')[0] == root:
+                    todo.append(imported)
+
+    result = set()
+    for modname in modnames:
+        filename = getattr(sys.modules.get(modname), '__file__', None)
+        if filename is not None:
+            result.add(os.path.abspath(filename))
+    result.update(os.path.abspath(filename)
+                  for func, filename in _hook_sources()
+                  if filename is not None)
+    return result
+
+
+class Manifest:
+    """The manifest of an output directory.
+
+    The *fingerprint* should be a [bananadoc.manifest.hooks_fingerprint]
+    result. Nothing is considered up to date if it's different from the
+    fingerprint that was saved. If *load* is false, the saved manifest
+    is not read at all and the manifest starts empty.
+    """
+
+    def __init__(self, outdir, fingerprint, load=True):
+        self.path = os.path.join(outdir, FILENAME)
+        self.fingerprint = fingerprint
+        self._file_hashes = {}
+        self._modules = {}
+        if not load:
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                content = json.load(f)
+        except (OSError, ValueError):
+            return
+        if (content.get('version') == VERSION
+                and content.get('fingerprint') == fingerprint):
+            self._modules = content['modules']
+
+    def _hash(self, files, directories):
+        sha = hashlib.sha256()
+        for path in sorted(files):
+            sha.update(path.encode('utf-8', errors='replace'))
+            sha.update(str(_hash_file(path, self._file_hashes)).encode())
+        for name in _listing(directories):
+            sha.update(name.encode('utf-8', errors='replace'))
+        return sha.hexdigest()
+
+    def lookup(self, modname):
+        """Return a dict of saved information or None if *modname* changed.
+
+        The dict has these keys: `'filename'`, `'is_package'`,
+        `'outfiles'`, `'submodules'`, `'files'`, `'path'`, `'exports'`,
+        `'symbols'` and `'seconds'`.
+        """
+        try:
+            entry = self._modules[modname]
+        except KeyError:
+            return None
+        if not all(map(os.path.isfile, entry['outfiles'])):
+            return None
+        if self._hash(entry['files'], entry['path']) != entry['hash']:
+            return None
+        return entry
+
+    def record(self, modname, filename, is_package, outfiles, submodules,
+               files, path=(), exports=(), symbols=(), seconds=None):
+        """Remember that *modname* was documented.
+
+        *files* should be an iterable of source files that the module's
+        documentation depends on, and *path* is the `__path__` of a
+        package. *exports* is a list from
+        [bananadoc.links.Registry.exports], and *symbols* is a list from
+        [bananadoc.links.symbols]. *seconds* is how long documenting the
+        module took, or None if it's not known.
+        """
+        files = sorted(set(files) | {os.path.abspath(filename)})
+        self._modules[modname] = {
+            'filename': filename,
+            'is_package': is_package,
+            'outfiles': list(outfiles),
+            'submodules': list(submodules),
+            'files': files,
+            'path': list(path),
+            'exports': list(exports),
+            'symbols': list(symbols),
+            'seconds': seconds,
+            'hash': self._hash(files, path),
+        }
+
+    def entries(self):
+        """Return a dict with module names as keys and saved dicts as values.
+
+        The dicts are like [bananadoc.manifest.Manifest.lookup] returns,
+        but they are returned even if the modules changed.
+        """
+        return dict(self._modules)
+
+    def add_entry(self, modname, entry):
+        """Add a dict from another manifest.
+
+        The dict should come from [bananadoc.manifest.Manifest.entries].
+        """
+        self._modules[modname] = entry
+
+    def save(self):
+        """Write the manifest to the output directory."""
+        os.makedirs(os.path.dirname(self.path) or os.curdir, exist_ok=True)
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump({'version': VERSION, 'fingerprint': self.fingerprint,
+                       'modules': self._modules}, f, indent=1, sort_keys=True)
+            f.write('\n')
+
+
+def timings(outdir):
+    """Return a `{modname: seconds}` dict from the manifest in *outdir*.
+
+    The fingerprint of the manifest doesn't matter here, because the
+    modules probably take about as long as before anyway. This returns
+    an empty dict if there's no usable manifest.
+    """
+    try:
+        with open(os.path.join(outdir, FILENAME), 'r', encoding='utf-8') as f:
+            content = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if content.get('version') != VERSION:
+        return {}
+    return {modname: entry.get('seconds')
+            for modname, entry in content['modules'].items()
+            if entry.get('seconds') is not None}
@@ -0,0 +1,296 @@
+# Copyright (c) 2017 Akuli
+
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""Classes that write the documentation files.
+
+The files are written in background threads, so the main thread can
+document more modules meanwhile. Each file is first written to a
+temporary file that is then renamed, so nobody sees half-written files.
+
+The documentation can also be written to a zip or tar file with
+[bananadoc.output.ArchiveWriter].
+"""
+
+import concurrent.futures
+import io
+import json
+import os
+import tarfile
+import tempfile
+import threading
+import time
+import zipfile
+
+
+# The output "directory" is an archive if it ends with one of these.
+ARCHIVE_EXTENSIONS = ('.zip', '.tar', '.tar.gz', '.tgz')
+# The files that were written to an output directory, so that SyncWriter
+# knows which files it can remove.
+FILENAME = '.bananadoc-files.json'
+
+
+def _is_hidden(relative):
+    # Metadata files like the manifest start with a dot.
+    return any(part.startswith('.') for part in relative.split('/'))
+
+
+def _load_files(outdir):
+    try:
+        with open(os.path.join(outdir, FILENAME), 'r',
+                  encoding='utf-8') as f:
+            return set(json.load(f))
+    except (OSError, ValueError, TypeError):
+        return set()
+
+
+def _get_umask():
+    # There's no way to get the umask without setting it.
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
+
+
+class DirectoryWriter:
+    """Write each file as is, overwriting old files.
+
+    The files are written in *threads* threads, or in the thread that
+    calls [bananadoc.output.DirectoryWriter.write] if *threads* is 0.
+    Errors from the threads are raised from
+    [bananadoc.output.DirectoryWriter.flush] or
+    [bananadoc.output.DirectoryWriter.close].
+
+    When the writer is closed, the paths of the files that were written
+    or kept with [bananadoc.output.DirectoryWriter.keep] are saved to a
+    file in the output directory. Files whose names start with a dot are
+    not included.
+    """
+
+    def __init__(self, outdir, threads=4):
+        self.outdir = outdir
+        self.written = 0
+        self._needed = set()        # absolute paths
+        # Files are created with the same permissions as open() would
+        # use, and os.umask() isn't thread-safe.
+        self._mode = 0o666 & ~_get_umask()
+        self._directories = set()   # directories that exist
+        self._lock = threading.Lock()
+        self._futures = []
+        if threads:
+            self._pool = concurrent.futures.ThreadPoolExecutor(threads)
+        else:
+            self._pool = None
+
+    def _makedirs(self, directory):
+        if directory not in self._directories:
+            os.makedirs(directory, exist_ok=True)
+            self._directories.add(directory)
+
+    def _replace(self, path, content):
+        directory = os.path.dirname(path) or os.curdir
+        self._makedirs(directory)
+        # The temporary file starts with a dot and doesn't end with .md,
+        # so it doesn't look like documentation if it's left behind.
+        fd, temp = tempfile.mkstemp(
+            prefix='.%s.' % os.path.basename(path), suffix='.tmp',
+            dir=directory)
+        try:
+            os.chmod(temp, self._mode)
+            with open(fd, 'w') as f:
+                f.write(content)
+            os.replace(temp, path)
+        except BaseException:
+            os.remove(temp)
+            raise
+
+    def _write_file(self, path, content):
+        self._replace(path, content)
+        with self._lock:
+            self.written += 1
+
+    def _submit(self, func, *args):
+        if self._pool is None:
+            func(*args)
+        else:
+            self._futures.append(self._pool.submit(func, *args))
+
+    def write(self, path, content):
+        """Write *content* to a file, creating directories as needed."""
+        self.keep(path)
+        self._submit(self._write_file, path, content)
+
+    def keep(self, path):
+        """Tell the writer that an existing file is still needed."""
+        self._needed.add(os.path.abspath(path))
+
+    def _relative_needed(self):
+        outdir = os.path.abspath(self.outdir)
+        result = set()
+        for path in self._needed:
+            relative = os.path.relpath(path, outdir).replace(os.sep, '/')
+            if not _is_hidden(relative):
+                result.add(relative)
+        return result
+
+    def flush(self):
+        """Wait until everything has been written."""
+        futures = self._futures
+        self._futures = []
+        # This raises the first error.
+        for future in futures:
+            future.result()
+
+    def close(self):
+        """Finish writing."""
+        try:
+            self.flush()
+        finally:
+            if self._pool is not None:
+                self._pool.shutdown()
+        self._replace(os.path.join(self.outdir, FILENAME),
+                      json.dumps(sorted(self._relative_needed()),
+                                 indent=1) + '\n')
+
+
+class SyncWriter(DirectoryWriter):
+    """Write only the files that changed and remove stale files.
+
+    Files that already have the correct content are left alone, so
+    their modification times don't change. When the writer is closed,
+    files that a previous writer wrote to the output directory, that end
+    with one of the *extensions* and were not written or kept this time
+    are removed, and so are the directories that become empty. Other
+    files are never removed, so the output directory can contain other
+    files too.
+    """
+
+    def __init__(self, outdir, extensions=('.md',), threads=4):
+        super().__init__(outdir, threads)
+        self.extensions = tuple(extensions)
+        self.unchanged = 0
+        self.removed = 0
+        self._previous = _load_files(outdir)
+
+    def _sync_file(self, path, content):
+        try:
+            with open(path, 'r') as f:
+                # Reading one character more than needed tells us if
+                # the file is longer than the content.
+                old = f.read(len(content) + 1)
+        except (OSError, UnicodeDecodeError):
+            old = None
+        if old == content:
+            with self._lock:
+                self.unchanged += 1
+        else:
+            self._write_file(path, content)
+
+    def write(self, path, content):
+        self.keep(path)
+        self._submit(self._sync_file, path, content)
+
+    def close(self):
+        super().close()
+        outdir = os.path.abspath(self.outdir)
+        stale = self._previous - self._relative_needed()
+        for relative in sorted(stale):
+            if (_is_hidden(relative) or relative.startswith('../')
+                    or not relative.endswith(self.extensions)):
+                continue
+            path = os.path.join(outdir, *relative.split('/'))
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                continue
+            self.removed += 1
+            # Empty directories that were there before are left alone.
+            directory = os.path.dirname(path)
+            while directory != outdir and not os.listdir(directory):
+                os.rmdir(directory)
+                directory = os.path.dirname(directory)
+
+
+def is_archive(outdir):
+    """Check if *outdir* should be written with an ArchiveWriter."""
+    return outdir == '-' or outdir.endswith(ARCHIVE_EXTENSIONS)
+
+
+class ArchiveWriter:
+    """Write the files into a zip or tar file instead of a directory.
+
+    The *outdir* should end with one of the `ARCHIVE_EXTENSIONS`, or be
+    `'-'` for writing an uncompressed tar file to *stream*. The paths
+    passed to [bananadoc.output.ArchiveWriter.write] are like the paths
+    that would be used with a [bananadoc.output.DirectoryWriter], and
+    they are converted to names of archive members by making them
+    relative to *outdir*.
+
+    Archives can't be written to from many threads, so everything is
+    written in the thread that calls
+    [bananadoc.output.ArchiveWriter.write].
+    """
+
+    def __init__(self, outdir, stream=None):
+        self.outdir = outdir
+        self.written = 0
+        self._mtime = time.time()
+        self._zip = self._tar = None
+        if outdir == '-':
+            # 'w|' doesn't seek, so this works with pipes.
+            self._tar = tarfile.open(fileobj=stream, mode='w|')
+        elif outdir.endswith('.zip'):
+            self._zip = zipfile.ZipFile(outdir, 'w', zipfile.ZIP_DEFLATED)
+        elif outdir.endswith(('.gz', '.tgz')):
+            self._tar = tarfile.open(outdir, 'w:gz')
+        else:
+            self._tar = tarfile.open(outdir, 'w')
+
+    def write(self, path, content):
+        """Add a file with *content* to the archive."""
+        name = os.path.relpath(path, self.outdir).replace(os.sep, '/')
+        data = content.encode('utf-8')
+        if self._zip is not None:
+            info = zipfile.ZipInfo(name, time.localtime(self._mtime)[:6])
+            info.compress_type = zipfile.ZIP_DEFLATED
+            info.external_attr = 0o644 << 16
+            self._zip.writestr(info, data)
+        else:
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            info.mtime = self._mtime
+            info.mode = 0o644
+            self._tar.addfile(info, io.BytesIO(data))
+        self.written += 1
+
+    def keep(self, path):
+        """This does nothing because archives are always written again."""
+
+    def flush(self):
+        """This does nothing because files are added when they are written."""
+
+    def close(self):
+        """Finish the archive.
+
+        When writing to a stream, the stream is not closed.
+        """
+        if self._zip is not None:
+            self._zip.close()
+        else:
+            self._tar.close()
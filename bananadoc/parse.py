@@ -21,19 +21,14 @@
 
 """The parsing functions."""
 
+import collections
 import functools
 import importlib
 import inspect
-import os
+import pkgutil
+import sys
 import types
-
-try:
-    import enum
-except ImportError:
-    # Running on Python 3.3 without enum34, but we don't need to warn
-    # about this because the modules we are documenting can't contain
-    # enums.
-    enum = None
+import weakref
 
 
 class NoDocstring(Exception):
@@ -50,17 +45,23 @@ class NoDocstring(Exception):
 
 _parsingfuncs = []
 
+# {parsingfunc: (types, predicate)}, both are None if not given
+_parsingfunc_filters = {}
+
+# {type(obj): [(index, parsingfunc, predicate), ...]} where the index is
+# the position in reversed(_parsingfuncs)
+_dispatch_cache = {}
+_dispatch_counts = {'calls': 0, 'saved': 0}
+
 
-def parsingfunc(parsingfunc):
+def parsingfunc(parsingfunc=None, *, predicate=None):
     """Add a function that converts a documentable object to a Section.
 
     This is supposed to be used as a decorator. For example, like this:
 
     ```python
-    @parsingfunc
+    @parsingfunc(str)
     def parse_string(parentsection, name, value):
-        if not isinstance(value, str):
-            return False    # not processed
         sub = bananadoc.ObjectSection(
             parent.fullname, name, value,
             title="The '%s' string" % name,
@@ -81,14 +82,63 @@ def parsingfunc(parsingfunc):
     The parsing function should return True if it documented the value
     and False if it can't document it. It should take these positional
     arguments:
-    - *section:* A [Section](#section) object. The function should set
+    - *section:* A [bananadoc.Section] object. The function should set
       its *title* and *content* attributes.
     - *value:* The value that is being documented.
+
+    The argument of the decorator can be a type or a tuple of types, and
+    the parsing function is called only with instances of those types.
+    A *predicate* function can also be given, and then the parsing
+    function is called only if `predicate(value)` returns True. Parsing
+    functions that are added without a type or a predicate, like
+    `@parsingfunc` with no parentheses, are called with everything.
+
+    The newest parsing functions are tried first, and the types are
+    only used for skipping the parsing functions that would return
+    False anyway. See [bananadoc.dispatch_stats].
     """
+    if parsingfunc is None or isinstance(parsingfunc, (type, tuple)):
+        types_ = parsingfunc
+        if isinstance(types_, type):
+            types_ = (types_,)
+
+        def decorator(func):
+            _parsingfunc_filters[func] = (types_, predicate)
+            _parsingfuncs.append(func)
+            _dispatch_cache.clear()
+            return func
+
+        return decorator
+
+    _parsingfunc_filters[parsingfunc] = (None, None)
     _parsingfuncs.append(parsingfunc)
+    _dispatch_cache.clear()
     return parsingfunc
 
 
+def _find_parsingfuncs(cls):
+    result = []
+    for index, func in enumerate(reversed(_parsingfuncs)):
+        # Functions that were appended to _parsingfuncs directly don't
+        # have filters.
+        types_, predicate = _parsingfunc_filters.get(func, (None, None))
+        if types_ is None or issubclass(cls, types_):
+            result.append((index, func, predicate))
+    return result
+
+
+def dispatch_stats():
+    """Return a dict of statistics about calling parsing functions.
+
+    The dict has these keys:
+    - `'calls'`: number of times a parsing function was called
+    - `'saved'`: number of parsing function calls that were skipped
+      because the parsing function was added with a type or predicate
+      that didn't match
+    """
+    return dict(_dispatch_counts)
+
+
 class Section:
     """A section with a title and content.
 
@@ -102,8 +152,15 @@ class Section:
     - *content:* The content of this section as a string without a
       title. Leading and trailing newlines are ignored.
     - *subs:* A list of other Section objects inside this section.
+
+    Other attributes can be added to sections, so parsing functions and
+    module hooks can store their own data in them.
     """
 
+    # There are lots of sections, and they are smaller with __slots__.
+    # The __dict__ is created only when something else is set.
+    __slots__ = ('title', 'content', 'subs', '__dict__', '__weakref__')
+
     def __init__(self, title=None, content=None):
         """Initialize the Section."""
         self.title = title
@@ -120,26 +177,66 @@ class Section:
     def walk_subs(self):
         """Iterate over the subsections recursively.
 
-        This does not include the initial subsection.
+        This does not include the initial subsection. The subsections
+        come out in the same order as they are dumped.
         """
-        for sub in self.subs:
+        # A stack instead of recursion works with any nesting depth.
+        stack = self.subs[::-1]
+        while stack:
+            sub = stack.pop()
             yield sub
-            yield from sub.walk_subs()
+            stack.extend(reversed(sub.subs))
+
+    def render(self, encoding=None, titlelevel=1):
+        """Return the documentation as a Markdown string.
+
+        If *encoding* is given, the string is encoded and bytes are
+        returned instead. See `bananadoc.renderers` for other formats.
+        """
+        # bananadoc.renderers imports this module, so it can't be
+        # imported at the top.
+        from bananadoc import renderers
+        [result] = renderers.render(self, [renderers.MarkdownRenderer()],
+                                    titlelevel)
+        if encoding is not None:
+            return result.encode(encoding)
+        return result
 
     def dump(self, stream, titlelevel=1):
-        """Write the documentation to *stream*."""
-        assert self.title is not None, "title of %r wasn't set" % self
-        assert self.content is not None, "content of %r wasn't set" % self
-        print('#' * titlelevel, self.title, end='\n\n', file=stream)
-        print(self.content.strip('\n'), end='\n\n', file=stream)
-        for sub in self.subs:
-            sub.dump(stream, titlelevel+1)
+        """Write the documentation to *stream*.
+
+        The documentation is rendered with [bananadoc.Section.render]
+        first, and then written with one `write()` call.
+        """
+        stream.write(self.render(titlelevel=titlelevel))
+
+    def release(self):
+        """Drop references to documented objects from this section.
+
+        This does nothing by default. Subclasses that refer to the
+        documented objects should override this, and make sure that
+        the section can still be dumped after calling this.
+        """
+
+    def freeze(self):
+        """Release this section and all subsections.
+
+        This calls [bananadoc.Section.release] on each of them. After
+        this, the section tree doesn't keep the documented objects
+        alive, so they can be garbage collected while the tree is still
+        used for dumping. This is done after running the module hooks
+        added with [bananadoc.modulehook] because they may need the
+        objects.
+        """
+        self.release()
+        for sub in self.walk_subs():
+            sub.release()
 
 
 class ObjectSection(Section):
     """An object that represents a Python object's documentation.
 
-    In addition to [Section](#section) attributes, ObjectSections also
+    In addition to [bananadoc.Section] attributes, ObjectSections also
     have these attributes:
 
     - *location:* A modulename-like string that points to the object
@@ -150,13 +247,16 @@ class ObjectSection(Section):
       level module that everything else is in.
     - *name:* The name in *location* that this section represents. This
       would be `method` in the previous example.
-    - *value:* The value that is documented.
+    - *value:* The value that is documented. This is None after
+      freezing with [bananadoc.Section.freeze].
     """
 
+    __slots__ = ('location', 'name', 'value')
+
     def __init__(self, location, name, value, **kwargs):
         """Initialize the ObjectSection.
 
-        `**kwargs` are passed to [Section](#section)'s `__init__`.
+        `**kwargs` are passed to [bananadoc.Section]'s `__init__`.
         """
         super().__init__(**kwargs)
         self.location = location
@@ -174,19 +274,141 @@ class ObjectSection(Section):
             return self.name
         return self.location + '.' + self.name
 
+    def release(self):
+        """Set *value* to None."""
+        self.value = None
+
     def parse_object(self, name, obj):
         """Try to parse an object using parsing functions."""
-        # We need to reverse because we want to use newly added dump
-        # functions first.
-        for parsingfunc in reversed(_parsingfuncs):
+        cls = type(obj)
+        try:
+            candidates = _dispatch_cache[cls]
+        except KeyError:
+            # The order is like in reversed(_parsingfuncs) because we
+            # want to use newly added parsing functions first.
+            candidates = _dispatch_cache[cls] = _find_parsingfuncs(cls)
+
+        calls = 0
+        for index, parsingfunc, predicate in candidates:
+            if predicate is not None and not predicate(obj):
+                continue
+            calls += 1
             if parsingfunc(self, name, obj):
-                # It did it.
+                # It did it. Without the types and predicates, we would
+                # have called index+1 parsing functions.
+                _dispatch_counts['calls'] += calls
+                _dispatch_counts['saved'] += index + 1 - calls
                 return
         # The data parsing function should be able to parse anything.
         assert False, ("the data parsing function didn't catch %s.%s"
                        % (self.fullname, name))
 
 
+CacheInfo = collections.namedtuple(
+    'CacheInfo', 'hits misses maxsize currsize')
+
+
+class _IdentityCache:
+    """A least recently used cache with objects as keys.
+
+    The objects are compared by identity, so they don't need to be
+    hashable. Only weak references to the objects are kept, so the cache
+    doesn't keep anything alive, and objects that don't support weak
+    references are not cached at all.
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = collections.OrderedDict()   # {id(obj): (ref, value)}
+
+    def get(self, obj, compute):
+        key = id(obj)
+        try:
+            ref, value = self._data[key]
+        except KeyError:
+            pass
+        else:
+            # A dead object's id may have been reused.
+            if ref() is obj:
+                self.hits += 1
+                self._data.move_to_end(key)
+                return value
+
+        self.misses += 1
+        value = compute(obj)
+        try:
+            ref = weakref.ref(obj)
+        except TypeError:
+            return value
+        self._data[key] = (ref, value)
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+        return value
+
+    def clear(self):
+        self._data.clear()
+        self.hits = self.misses = 0
+
+
+# The docstrings are cached by the docstring itself, not by the object.
+# Modules keep their identity when they are reloaded, but they get a new
+# docstring.
+@functools.lru_cache(maxsize=4096)
+def _cleandoc(doc):
+    return inspect.cleandoc(doc)
+
+
+_signature_cache = _IdentityCache(4096)
+
+
+def getdoc(obj):
+    """Return the cleaned docstring of *obj*, or None if it doesn't have one.
+
+    Unlike `inspect.getdoc`, this doesn't look for docstrings in base
+    classes. The results are cached, so documenting an object that is
+    exported from many modules doesn't clean the docstring many times.
+    """
+    doc = obj.__doc__
+    if doc is None:
+        return None
+    if not isinstance(doc, str):
+        return inspect.cleandoc(doc)
+    return _cleandoc(doc)
+
+
+def getsignature(func):
+    """Return `str(inspect.signature(func))` using a cache like getdoc()."""
+    return _signature_cache.get(func, lambda func: str(inspect.signature(func)))
+
+
+def cache_info():
+    """Return statistics about the docstring and signature caches.
+
+    The result is a named tuple like in `functools.lru_cache`, with
+    *hits*, *misses*, *maxsize* and *currsize* attributes. The numbers
+    of the two caches are added together.
+    """
+    doc_info = _cleandoc.cache_info()
+    return CacheInfo(doc_info.hits + _signature_cache.hits,
+                     doc_info.misses + _signature_cache.misses,
+                     doc_info.maxsize + _signature_cache.maxsize,
+                     doc_info.currsize + len(_signature_cache._data))
+
+
+def clear_caches():
+    """Forget the cached docstrings, signatures and submodule names.
+
+    Call this if the source files might have changed. This is also done
+    after reloading modules, so that the results for the old versions
+    of the modules don't take space in the caches.
+    """
+    _cleandoc.cache_clear()
+    _signature_cache.clear()
+    _submodule_index.clear()
+
+
 # This will contain functions that are called on the top level Section
 # before dumping it.
 _modulehooks = []
@@ -195,7 +417,7 @@ _modulehooks = []
 def modulehook(func):
     """Add a module parsing hook function.
 
-    See [parse_module](#parse-module) for more info.
+    See [bananadoc.parse_module] for more info.
     """
     _modulehooks.append(func)
     return func
@@ -210,7 +432,9 @@ def _module_sorting_key(module, name):
       3. exceptions
       4. other data
     """
-    value = getattr(module, name)
+    # Submodules are not always imported, but they are not documented
+    # with the other things anyway.
+    value = getattr(module, name, None)
     if isinstance(value, type):
         if issubclass(value, Exception):
             return 3, name
@@ -229,46 +453,105 @@ def _clean_summary(line):
     return (firstword + space + rest).rstrip('.?!')
 
 
-def _import_submodules(package):
-    for path in package.__path__:
-        for name, ext in map(os.path.splitext, os.listdir(path)):
-            if (ext == '.py'
-                    and name.isidentifier()
-                    and not name.startswith('_')):
-                # public Python module with a valid name
-                importlib.import_module(package.__name__ + '.' + name)
+# {package name: frozenset of submodule names}
+_submodule_index = {}
+
+
+def _submodule_names(packagename, path):
+    """Return the names of the submodules and subpackages of a package.
+
+    The names are looked up from the package's `__path__` once, and
+    then they are cached for the rest of the run. This includes
+    extension modules and modules whose names start with `_`.
+    """
+    try:
+        return _submodule_index[packagename]
+    except KeyError:
+        result = _submodule_index[packagename] = frozenset(
+            info.name for info in pkgutil.iter_modules(path))
+        return result
+
+
+def _all_list(module, submodule_names):
+    try:
+        return module.__all__
+    except AttributeError:
+        # Submodules that haven't been imported are not in the dir().
+        all_list = []
+        for name in set(dir(module)) | submodule_names:
+            if not name.startswith('_'):
+                all_list.append(name)
+        key = functools.partial(_module_sorting_key, module)
+        all_list.sort(key=key)
+        return all_list
 
 
-def parse_module(modulename):
-    """Create an [ObjectSection](#objectsection) of a module.
+def is_documented(rootname, modulename, name=None, submodules=True):
+    """Check if documenting *rootname* also documents *modulename*.
 
-    Each hook function added with [modulehook](#modulehook) is called on
+    This uses the `__all__` lists of the imported modules like
+    [bananadoc.parse_module] does, so the modules must be imported
+    first. If *name* is given, this also checks if the module documents
+    its attribute with that name. If *submodules* is false, only
+    *rootname* itself is documented.
+    """
+    if modulename == rootname:
+        parents = []
+    elif modulename.startswith(rootname + '.') and submodules:
+        parts = modulename.split('.')
+        parents = [(parts[:i], parts[i])
+                   for i in range(rootname.count('.') + 1, len(parts))]
+    else:
+        return False
+
+    for parentparts, childname in parents:
+        parent = sys.modules.get('.'.join(parentparts))
+        path = getattr(parent, '__path__', None)
+        if path is None:
+            return False
+        submodule_names = _submodule_names(parent.__name__, path)
+        if (childname not in submodule_names
+                or childname not in _all_list(parent, submodule_names)):
+            return False
+
+    if name is None:
+        return True
+    module = sys.modules.get(modulename)
+    if module is None:
+        return False
+    if hasattr(module, '__path__'):
+        submodule_names = _submodule_names(modulename, module.__path__)
+    else:
+        submodule_names = frozenset()
+    return name in _all_list(module, submodule_names)
+
+
+def parse_module(modulename, registry=None):
+    """Create a [bananadoc.ObjectSection] of a module.
+
+    Each hook function added with [bananadoc.modulehook] is called on
     the section before returning it.
 
     This does not document submodules, so this returns the section and a
     list of public submodule names that were not documented.
+
+    If a `bananadoc.links.Registry` is given, classes and functions that
+    it has seen before are not documented again. Instead, the module
+    gets a short section that links to the existing documentation.
     """
     module = importlib.import_module(modulename)
     if module.__doc__ is None:
         raise NoDocstring(modulename)
     its_a_package = hasattr(module, '__path__')
 
-    try:
-        all_list = module.__all__
-    except AttributeError:
-        if its_a_package:
-            # We need to import all submodules. Just importing them
-            # attaches them to the module object, so the dir() will find
-            # them.
-            _import_submodules(module)
-        all_list = []
-        for name in dir(module):
-            if not name.startswith('_'):
-                all_list.append(name)
-        key = functools.partial(_module_sorting_key, module)
-        all_list.sort(key=key)
+    if its_a_package:
+        submodule_names = _submodule_names(modulename, module.__path__)
+    else:
+        submodule_names = frozenset()
+
+    all_list = _all_list(module, submodule_names)
 
-    doc = inspect.cleandoc(module.__doc__)
+    doc = getdoc(module)
     summary, junk, description = doc.partition('\n')
     title = modulename
     if summary:
@@ -280,17 +563,15 @@ def parse_module(modulename):
 
     submodules = []
     for name in all_list:
-        if its_a_package:
-            try:
-                submodulename = modulename + '.' + name
-                importlib.import_module(submodulename)
-                # It's a submodule.
-                submodules.append(submodulename)
-                continue
-            except ImportError:
-                # It's a variable, keep going normally.
-                pass
-        mainsection.parse_object(name, getattr(module, name))
+        if name in submodule_names:
+            submodules.append(modulename + '.' + name)
+            continue
+        value = getattr(module, name)
+        if registry is None:
+            mainsection.parse_object(name, value)
+        else:
+            registry.parse_object(mainsection, name, value, functools.partial(
+                mainsection.parse_object, name, value))
 
     for hook in _modulehooks:
         hook(mainsection)
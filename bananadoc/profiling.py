@@ -0,0 +1,184 @@
+# Copyright (c) 2017 Akuli
+
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""Find out which parts of a documentation build are slow.
+
+Nothing here is used unless profiling is turned on, so profiling costs
+nothing when it's off. The parsing functions and module hooks are
+replaced with wrappers that measure them when the profiler is
+installed, and the original functions are put back when it's
+uninstalled.
+"""
+
+import collections
+import contextlib
+import functools
+import json
+import os
+import sys
+import time
+
+from bananadoc import parse
+
+
+class _Event:
+
+    def __init__(self, name, category, module, start):
+        self.name = name
+        self.category = category
+        self.module = module
+        self.start = start
+        self.duration = 0
+        self.self_duration = 0    # without nested events
+        self.net_blocks = 0       # change in number of allocated blocks
+
+
+class Profiler:
+    """Measure time and memory usage of a documentation build.
+
+    Times are measured with `time.perf_counter()`. The memory usage is
+    the net change in `sys.getallocatedblocks()`, so it's the number of
+    blocks that were still allocated at the end, not the number of
+    allocations. It's negative if more was freed than allocated.
+    """
+
+    def __init__(self):
+        self.events = []
+        self.module = None      # name of the module being documented
+        self._stack = []
+        self._originals = None      # {wrapper: original function}
+        self._start = time.perf_counter()
+
+    @contextlib.contextmanager
+    def measure(self, name, category):
+        """Measure the code in a `with` statement."""
+        event = _Event(name, category, self.module, time.perf_counter())
+        blocks = sys.getallocatedblocks()
+        self._stack.append(event)
+        try:
+            yield
+        finally:
+            event.duration = time.perf_counter() - event.start
+            event.net_blocks = sys.getallocatedblocks() - blocks
+            self._stack.pop()
+            event.self_duration += event.duration
+            if self._stack:
+                self._stack[-1].self_duration -= event.duration
+            self.events.append(event)
+
+    def _wrap(self, func, category):
+        name = '%s.%s' % (func.__module__, func.__qualname__)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with self.measure(name, category):
+                return func(*args, **kwargs)
+
+        self._originals[wrapper] = func
+        return wrapper
+
+    def install(self):
+        """Start measuring parsing functions and module hooks."""
+        assert self._originals is None, "already installed"
+        self._originals = {}
+        wrapped = []
+        for func in parse._parsingfuncs:
+            wrapper = self._wrap(func, 'parsingfunc')
+            parse._parsingfunc_filters[wrapper] = \
+                parse._parsingfunc_filters.get(func, (None, None))
+            wrapped.append(wrapper)
+        parse._parsingfuncs[:] = wrapped
+        parse._modulehooks[:] = [self._wrap(hook, 'modulehook')
+                                 for hook in parse._modulehooks]
+        parse._dispatch_cache.clear()
+
+    def uninstall(self):
+        """Put back the original parsing functions and module hooks.
+
+        Functions that were added while the profiler was installed are
+        left alone.
+        """
+        originals = self._originals
+        parse._parsingfuncs[:] = [originals.get(func, func)
+                                  for func in parse._parsingfuncs]
+        parse._modulehooks[:] = [originals.get(hook, hook)
+                                 for hook in parse._modulehooks]
+        for wrapper in originals:
+            parse._parsingfunc_filters.pop(wrapper, None)
+        parse._dispatch_cache.clear()
+        self._originals = None
+
+    def summary(self, count):
+        """Return a list of lines that describe the slowest things.
+
+        There are at most *count* lines about the things, like phases
+        and hooks, and *count* lines about the slowest modules.
+        """
+        # {(category, name): [seconds, calls, net_blocks]}
+        things = collections.defaultdict(lambda: [0, 0, 0])
+        modules = collections.defaultdict(lambda: [0, 0, 0])
+        for event in self.events:
+            for key, dictionary in [((event.category, event.name), things),
+                                    (event.module, modules)]:
+                if key is None:
+                    continue
+                dictionary[key][0] += event.self_duration
+                dictionary[key][1] += 1
+                dictionary[key][2] += event.net_blocks
+
+        lines = ["%10s %7s %10s  %s" % ("self time", "calls", "net blocks",
+                                        "what")]
+        for (category, name), (seconds, calls, blocks) in sorted(
+                things.items(), key=lambda item: -item[1][0])[:count]:
+            lines.append("%9.3fs %7d %+10d  %s %s" % (
+                seconds, calls, blocks, category, name))
+        lines.append('')
+        lines.append("%10s %7s %10s  %s" % ("time", "events", "net blocks",
+                                            "module"))
+        for module, (seconds, calls, blocks) in sorted(
+                modules.items(), key=lambda item: -item[1][0])[:count]:
+            lines.append("%9.3fs %7d %+10d  %s" % (
+                seconds, calls, blocks, module))
+        return lines
+
+    def write_trace(self, path):
+        """Write the events to a file in Chrome's trace event format.
+
+        The file can be opened in `chrome://tracing` and other tools
+        that support the format.
+        """
+        pid = os.getpid()
+        trace_events = []
+        for event in self.events:
+            trace_events.append({
+                'name': event.name,
+                'cat': event.category,
+                'ph': 'X',
+                'ts': (event.start - self._start) * 1e6,
+                'dur': event.duration * 1e6,
+                'pid': pid,
+                'tid': 0,
+                'args': {'module': event.module,
+                         'net_blocks': event.net_blocks},
+            })
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': trace_events,
+                       'displayTimeUnit': 'ms'}, f)
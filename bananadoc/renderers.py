@@ -0,0 +1,290 @@
+# Copyright (c) 2017 Akuli
+
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""Output formats for section trees.
+
+[bananadoc.Section.render] can only create Markdown. The renderers here
+create other formats too, and [bananadoc.renderers.render] feeds a
+section tree to many renderers while walking it only once.
+
+A renderer is created for each file that is written. Its
+[bananadoc.renderers.Renderer.add] method is called with each section in
+the tree, and then [bananadoc.renderers.Renderer.finish] returns the
+content of the file. New formats can be added with the
+[bananadoc.renderers.renderer] decorator.
+"""
+
+import collections
+import html
+import json
+import re
+
+try:
+    import markdown
+except ImportError:
+    # A simple converter is used instead.
+    markdown = None
+
+from bananadoc import links, parse
+
+
+__all__ = ['Renderer', 'MarkdownRenderer', 'HTMLRenderer', 'JSONRenderer',
+           'renderer', 'get_renderer', 'render']
+
+_renderers = collections.OrderedDict()    # {name: class}
+
+
+def renderer(name):
+    """A decorator that adds a new output format.
+
+    Use it like this:
+
+    ```py
+    @bananadoc.renderers.renderer('text')
+    class TextRenderer(bananadoc.renderers.Renderer):
+        extension = '.txt'
+        ...
+    ```
+
+    The *name* is what the user can give to `--format`. The formats are
+    checked after importing the documented package, so the package can
+    add its own renderers.
+    """
+    def inner(cls):
+        _renderers[name] = cls
+        return cls
+
+    return inner
+
+
+def get_renderer(name):
+    """Return the renderer class of a format.
+
+    KeyError is raised if no renderer was added with this name.
+    """
+    return _renderers[name]
+
+
+class Renderer:
+    """The base class for renderers.
+
+    Subclasses should set *extension* to the file name extension of the
+    format, and override [bananadoc.renderers.Renderer.add] and
+    [bananadoc.renderers.Renderer.finish]. The default implementation of
+    [bananadoc.renderers.Renderer.finish] joins the strings in the
+    *parts* list.
+    """
+
+    extension = None
+
+    def __init__(self):
+        self.parts = []
+
+    def add(self, section, level):
+        """Add a section to the output.
+
+        The *level* is 1 for the top-level section, 2 for its subsections
+        and so on. The sections come in the order they are dumped.
+        """
+        raise NotImplementedError
+
+    def finish(self):
+        """Return the output as a string."""
+        return ''.join(self.parts)
+
+
+@renderer('markdown')
+class MarkdownRenderer(Renderer):
+    """Create Markdown like [bananadoc.Section.render]."""
+
+    extension = '.md'
+
+    def add(self, section, level):
+        """Add the title with `#` characters and the content."""
+        self.parts.append('#' * level + ' ' + section.title + '\n\n')
+        self.parts.append(section.content.strip('\n') + '\n\n')
+
+
+def _inline_html(text):
+    # Code spans are split out first because nothing in them is markup.
+    parts = re.split(r'(`[^`]*`)', text)
+    for index, part in enumerate(parts):
+        if index % 2 == 1:
+            parts[index] = '<code>%s</code>' % html.escape(part[1:-1])
+            continue
+        part = html.escape(part, quote=False)
+        part = re.sub(r'\[([^\]]*)\]\(([^)\s]*)\)',
+                      lambda match: '<a href="%s">%s</a>' % (
+                          match.group(2).replace('"', '&quot;'),
+                          match.group(1)),
+                      part)
+        part = re.sub(r'\*\*(.+?)\*\*', r'<strong>\1</strong>', part)
+        part = re.sub(r'\*(.+?)\*', r'<em>\1</em>', part)
+        parts[index] = part
+    return ''.join(parts)
+
+
+def _simple_html(text):
+    """Convert the Markdown that docstrings usually contain to HTML.
+
+    Only paragraphs, lists, fenced code blocks, code spans, links and
+    emphasis are supported.
+    """
+    blocks = []
+    paragraph = []
+    items = []
+    code = None
+
+    def end_block():
+        if paragraph:
+            blocks.append('<p>%s</p>' % _inline_html('\n'.join(paragraph)))
+            paragraph.clear()
+        if items:
+            blocks.append('<ul>\n%s\n</ul>' % '\n'.join(
+                '<li>%s</li>' % _inline_html(item) for item in items))
+            items.clear()
+
+    for line in text.split('\n'):
+        if code is not None:
+            if line.strip().startswith('```'):
+                blocks.append('<pre><code>%s</code></pre>'
+                              % html.escape('\n'.join(code)))
+                code = None
+            else:
+                code.append(line)
+        elif line.strip().startswith('```'):
+            end_block()
+            code = []
+        elif not line.strip():
+            end_block()
+        elif re.match(r'\s*[-*] ', line) and not paragraph:
+            items.append(line.strip()[2:])
+        elif items and line.startswith(' '):
+            items[-1] += ' ' + line.strip()
+        else:
+            if items:
+                end_block()
+            paragraph.append(line)
+    if code is not None:
+        # The code block wasn't closed.
+        blocks.append('<pre><code>%s</code></pre>'
+                      % html.escape('\n'.join(code)))
+    end_block()
+    return '\n'.join(blocks)
+
+
+@renderer('html')
+class HTMLRenderer(Renderer):
+    """Create an HTML page.
+
+    The content of the sections is converted with the `markdown` module
+    if it's installed, and with a simple converter otherwise. Links to
+    `.md` files are changed to point to the `.html` files.
+    """
+
+    extension = '.html'
+
+    def __init__(self):
+        super().__init__()
+        self._title = None
+        self._anchors = links.Anchors()
+
+    def add(self, section, level):
+        """Add a heading and the converted content.
+
+        The first title becomes the title of the page.
+        """
+        if self._title is None:
+            self._title = section.title
+        # HTML has no h7, but deeper levels are rare.
+        tag = 'h%d' % min(level, 6)
+        self.parts.append('<%s id="%s">%s</%s>\n' % (
+            tag, html.escape(self._anchors.add(section.title)),
+            html.escape(section.title), tag))
+        content = section.content.strip('\n')
+        if markdown is None:
+            converted = _simple_html(content)
+        else:
+            converted = markdown.markdown(content,
+                                          extensions=['fenced_code'])
+        self.parts.append(re.sub(r'href="([^":#]*)\.md(#[^"]*)?"',
+                                 r'href="\1.html\2"', converted) + '\n')
+
+    def finish(self):
+        """Return a complete HTML page."""
+        return ('<!DOCTYPE html>\n<html>\n<head>\n<meta charset="utf-8">\n'
+                '<title>%s</title>\n</head>\n<body>\n%s</body>\n</html>\n'
+                % (html.escape(self._title or ''), ''.join(self.parts)))
+
+
+@renderer('json')
+class JSONRenderer(Renderer):
+    """Create a JSON object with nested sections.
+
+    Each section is an object with `title`, `content` and `subs` keys.
+    ObjectSections also have `location` and `name`.
+    """
+
+    extension = '.json'
+
+    def __init__(self):
+        super().__init__()
+        self._top = None
+        self._stack = []    # [(level, dict)]
+
+    def add(self, section, level):
+        """Add the section to the subs of its parent section."""
+        obj = collections.OrderedDict()
+        obj['title'] = section.title
+        if isinstance(section, parse.ObjectSection):
+            obj['location'] = section.location
+            obj['name'] = section.name
+        obj['content'] = section.content.strip('\n')
+        obj['subs'] = []
+
+        while self._stack and self._stack[-1][0] >= level:
+            self._stack.pop()
+        if self._stack:
+            self._stack[-1][1]['subs'].append(obj)
+        else:
+            self._top = obj
+        self._stack.append((level, obj))
+
+    def finish(self):
+        """Return the top-level section as JSON."""
+        return json.dumps(self._top, indent=2) + '\n'
+
+
+def render(section, renderers, titlelevel=1):
+    """Walk a section tree once and give each section to all renderers.
+
+    This returns a list of [bananadoc.renderers.Renderer.finish] results
+    in the same order as the *renderers*.
+    """
+    stack = [(section, titlelevel)]
+    while stack:
+        sect, level = stack.pop()
+        assert sect.title is not None, "title of %r wasn't set" % sect
+        assert sect.content is not None, "content of %r wasn't set" % sect
+        for each in renderers:
+            each.add(sect, level)
+        stack.extend((sub, level+1) for sub in reversed(sect.subs))
+    return [each.finish() for each in renderers]
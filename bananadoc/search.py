@@ -0,0 +1,216 @@
+# Copyright (c) 2017 Akuli
+
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""A search index for the generated documentation.
+
+The index is saved to the output directory next to the documentation,
+and `bananadoc query NAME` uses it to find things without importing or
+parsing anything. It's a JSON file like this:
+
+```
+{"version": 1,
+ "modules": [["fooproject.bar", "bar.md"], ...],
+ "entries": [[module_index, "fooproject.bar.Baz", "class Baz",
+              "class-baz"], ...],
+ "tokens": {"baz": [entry_index, ...], ...}}
+```
+
+Each entry is a section. The second item is the *fullname* of a
+[bananadoc.ObjectSection], and it's null for other sections. The tokens
+are lowercase words from the full names, titles and contents of the
+sections.
+"""
+
+import collections
+import json
+import os
+import re
+
+from bananadoc import links, parse
+
+
+FILENAME = '.bananadoc-index.json'
+VERSION = 1
+
+Match = collections.namedtuple('Match', 'fullname title path anchor')
+
+
+def tokenize(text):
+    """Return a set of lowercase words in *text*.
+
+    Words with underscores are also split, so `parse_module` gives
+    `parse_module`, `parse` and `module`.
+    """
+    result = set()
+    for word in re.findall(r'\w+', text.lower()):
+        result.add(word)
+        result.update(word.split('_'))
+    result.discard('')
+    return {word for word in result if len(word) >= 2}
+
+
+def collect(section):
+    """Return a list of index entries for a section tree.
+
+    Each entry is a list like `[fullname, title, anchor, tokens]`, and
+    the lists can be given to [bananadoc.search.IndexWriter.add].
+    """
+    entries = []
+    anchors = links.Anchors()
+    for sect in [section] + list(section.walk_subs()):
+        if isinstance(sect, parse.ObjectSection):
+            fullname = sect.fullname
+        else:
+            fullname = None
+        tokens = tokenize(sect.title) | tokenize(sect.content)
+        if fullname is not None:
+            tokens |= tokenize(fullname)
+        entries.append([fullname, sect.title, anchors.add(sect.title),
+                        sorted(tokens)])
+    return entries
+
+
+class IndexWriter:
+    """Build an index from the entries of many modules."""
+
+    def __init__(self):
+        self._modules = {}      # {modname: (path, entries)}
+
+    def add(self, modname, path, entries):
+        """Add a module's entries from [bananadoc.search.collect].
+
+        The *path* is the module's file relative to the output directory,
+        with `/` as the separator. Adding a module again replaces the old
+        entries.
+        """
+        self._modules[modname] = (path, entries)
+
+    def dumps(self):
+        """Return the content of the index file as a string."""
+        modules = []
+        entries = []
+        tokens = collections.defaultdict(list)
+        # Sorting makes the file the same no matter which order the
+        # modules were added in.
+        for modname, (path, module_entries) in sorted(self._modules.items()):
+            for fullname, title, anchor, entry_tokens in module_entries:
+                for token in entry_tokens:
+                    tokens[token].append(len(entries))
+                entries.append([len(modules), fullname, title, anchor])
+            modules.append([modname, path])
+
+        return json.dumps({'version': VERSION, 'modules': modules,
+                           'entries': entries, 'tokens': tokens},
+                          separators=(',', ':'))
+
+    def write(self, outdir):
+        """Save the index to the output directory."""
+        os.makedirs(outdir, exist_ok=True)
+        with open(os.path.join(outdir, FILENAME), 'w',
+                  encoding='utf-8') as f:
+            f.write(self.dumps())
+
+
+def _load(outdir):
+    with open(os.path.join(outdir, FILENAME), 'r', encoding='utf-8') as f:
+        content = json.load(f)
+    if content.get('version') != VERSION:
+        raise ValueError("the search index in %s has a different version"
+                         % outdir)
+    return content
+
+
+def load_modules(outdir):
+    """Read the entries of each module from a saved index.
+
+    This returns a dict like `{modname: (path, entries)}` for
+    [bananadoc.search.IndexWriter.add], or an empty dict if there's no
+    usable index in *outdir*.
+    """
+    try:
+        content = _load(outdir)
+    except (OSError, ValueError):
+        return {}
+
+    entry_tokens = [[] for junk in content['entries']]
+    for token, indexes in content['tokens'].items():
+        for index in indexes:
+            entry_tokens[index].append(token)
+
+    result = {modname: (path, []) for modname, path in content['modules']}
+    for (module_index, fullname, title, anchor), tokens in zip(
+            content['entries'], entry_tokens):
+        modname = content['modules'][module_index][0]
+        result[modname][1].append([fullname, title, anchor, sorted(tokens)])
+    return result
+
+
+class Index:
+    """A saved index that can be searched.
+
+    OSError is raised if the index file doesn't exist, and ValueError is
+    raised if it was created by an incompatible version of BananaDoc.
+    """
+
+    def __init__(self, outdir):
+        content = _load(outdir)
+        self._modules = content['modules']
+        self._entries = content['entries']
+        self._tokens = content['tokens']
+
+    def query(self, name, limit=None):
+        """Find entries that contain all words in *name*.
+
+        This returns a list of [bananadoc.search.Match] objects with the
+        best matches first. An exact full name is the best match, then
+        full names that end with *name*, then entries with all of the
+        words in the full name, then in the title and then anywhere.
+        """
+        words = tokenize(name)
+        if not words:
+            return []
+        # Starting with the shortest list is fastest.
+        postings = sorted((self._tokens.get(word, []) for word in words),
+                          key=len)
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            candidates.intersection_update(posting)
+
+        def rank(index):
+            module_index, fullname, title, anchor = self._entries[index]
+            if fullname == name:
+                score = 0
+            elif fullname is not None and fullname.endswith('.' + name):
+                score = 1
+            elif fullname is not None and words <= tokenize(fullname):
+                score = 2
+            elif words <= tokenize(title):
+                score = 3
+            else:
+                score = 4
+            return (score, len(fullname or title), fullname or title)
+
+        result = []
+        for index in sorted(candidates, key=rank)[:limit]:
+            module_index, fullname, title, anchor = self._entries[index]
+            path = self._modules[module_index][1]
+            result.append(Match(fullname, title, path, anchor))
+        return result
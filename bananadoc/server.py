@@ -0,0 +1,306 @@
+# Copyright (c) 2017 Akuli
+
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+"""Keep parsed documentation in memory and render it on request.
+
+`bananadoc serve` starts a server that listens on a UNIX socket. The
+documented modules are imported and parsed when they are asked for the
+first time, and after that the section trees come from a cache, so an
+editor can show documentation without starting Python and importing
+everything every time.
+
+Clients send JSON objects, one per line, and get one line of JSON back
+for each of them. A request looks like one of these:
+
+```
+{"module": "fooproject.bar", "format": "markdown"}
+{"symbol": "fooproject.bar.Baz.method", "format": "html"}
+```
+
+The format is optional and defaults to `"markdown"`. The response is
+`{"output": "...", "cached": true}` or `{"error": "..."}`, and *cached*
+is false if the module had to be parsed. [bananadoc.server.request] does
+all this for Python clients.
+
+Modules whose source files change are reloaded before the next request,
+and the least recently used trees are thrown away when the cache gets
+bigger than its size limit. References like `[fooproject.bar.Baz]` are
+not turned into links because the other modules may not be parsed.
+"""
+
+import collections
+import importlib
+import json
+import os
+import socket
+import socketserver
+
+import bananadoc
+import bananadoc.manifest
+import bananadoc.renderers
+import bananadoc.static
+import bananadoc.watch
+
+
+FILENAME = '.bananadoc.sock'
+
+
+def _tree_size(section):
+    # This is not the real memory usage, but it's proportional to it.
+    return sum(len(sect.title) + len(sect.content or '')
+               for sect in [section] + list(section.walk_subs()))
+
+
+class _Entry:
+
+    def __init__(self, section, filename, files):
+        self.section = section
+        self.filename = filename
+        self.files = files
+        self.outputs = {}       # {(fullname, format): text}
+        self.size = _tree_size(section)
+
+
+class Cache:
+    """Parsed modules and their rendered documentation.
+
+    Modules are parsed without importing them if *static* is true. The
+    sizes of the cached trees and outputs are estimated from the lengths
+    of the strings in them, and the least recently used modules are
+    thrown away when the total is more than *max_size* bytes. The most
+    recently used module is always kept.
+    """
+
+    def __init__(self, static=False, max_size=None):
+        self.static = static
+        self.max_size = max_size
+        self._entries = collections.OrderedDict()   # {modname: _Entry}
+        self._watcher = bananadoc.watch.FileWatcher()
+
+    @property
+    def size(self):
+        """The estimated total size of everything in the cache."""
+        return sum(entry.size for entry in self._entries.values())
+
+    def __len__(self):
+        return len(self._entries)
+
+    def reload(self):
+        """Forget modules whose source files changed.
+
+        This returns a list of `(modulename, exception)` pairs for
+        modules that could not be reloaded, like
+        `bananadoc.watch.reload_modules` does.
+        """
+        changed = self._watcher.changed()
+        if not changed:
+            return []
+
+        stale, failed = bananadoc.watch.reload_changed(changed, {
+            modname: (entry.filename, entry.files)
+            for modname, entry in self._entries.items()}, self.static)
+        for modname in stale:
+            del self._entries[modname]
+        return failed
+
+    def _parse(self, modname):
+        if self.static:
+            module = bananadoc.static.find_module(modname)
+            section, subs = bananadoc.parse_module_static(modname)
+            files = bananadoc.static.dependencies(modname)
+        else:
+            module = importlib.import_module(modname)
+            section, subs = bananadoc.parse_module(modname)
+            files = bananadoc.manifest.dependencies(section)
+        section.freeze()
+        filename = os.path.abspath(module.__file__)
+        files = {os.path.abspath(path) for path in files} | {filename}
+        for path in files:
+            self._watcher.add(path)
+        return _Entry(section, filename, files)
+
+    def _get(self, modname):
+        # Returns (entry, cached)
+        try:
+            self._entries.move_to_end(modname)
+            return self._entries[modname], True
+        except KeyError:
+            entry = self._entries[modname] = self._parse(modname)
+            return entry, False
+
+    def _evict(self):
+        if self.max_size is None:
+            return
+        total = self.size
+        while total > self.max_size and len(self._entries) > 1:
+            modname, entry = self._entries.popitem(last=False)
+            total -= entry.size
+
+    def _render(self, entry, section, format):
+        key = (getattr(section, 'fullname', None), format)
+        try:
+            return entry.outputs[key]
+        except KeyError:
+            renderer = bananadoc.renderers.get_renderer(format)()
+            [output] = bananadoc.renderers.render(section, [renderer])
+            entry.outputs[key] = output
+            entry.size += len(output)
+            return output
+
+    def render_module(self, modname, format='markdown'):
+        """Return a `(output, cached)` tuple for a module.
+
+        The *format* is a name given to [bananadoc.renderers.renderer].
+        """
+        bananadoc.renderers.get_renderer(format)    # check the name early
+        entry, cached = self._get(modname)
+        output = self._render(entry, entry.section, format)
+        self._evict()
+        return output, cached
+
+    def render_symbol(self, fullname, format='markdown'):
+        """Like render_module(), but for anything in a module.
+
+        *fullname* is a name like `fooproject.bar.Baz.method`. The
+        module is found by trying to import the longest part of
+        *fullname* that is a module. LookupError is raised if the module
+        doesn't have anything called *fullname*. The *format* is like in
+        [bananadoc.server.Cache.render_module].
+        """
+        bananadoc.renderers.get_renderer(format)
+        parts = fullname.split('.')
+        prefixes = {'.'.join(parts[:end]) for end in range(1, len(parts))}
+        for end in range(len(parts) - 1, 0, -1):
+            modname = '.'.join(parts[:end])
+            try:
+                entry, cached = self._get(modname)
+            except ImportError as e:
+                # Errors from importing other modules are not hidden.
+                if e.name not in prefixes:
+                    raise
+                continue
+            break
+        else:
+            raise ImportError("no module contains %s" % fullname,
+                              name=fullname)
+
+        for section in entry.section.walk_subs():
+            if getattr(section, 'fullname', None) == fullname:
+                break
+        else:
+            raise LookupError("%s has nothing called %s" % (modname, fullname))
+        output = self._render(entry, section, format)
+        self._evict()
+        return output, cached
+
+
+class _Handler(socketserver.StreamRequestHandler):
+
+    def _respond(self, line):
+        try:
+            request = json.loads(line.decode('utf-8'))
+            if not isinstance(request, dict):
+                raise ValueError("the request must be a JSON object")
+            format = request.get('format', 'markdown')
+        except ValueError as e:
+            return {'error': "invalid request: %s" % e}
+        try:
+            bananadoc.renderers.get_renderer(format)
+        except (KeyError, TypeError):
+            return {'error': "unknown format %r" % (format,)}
+
+        server = self.server
+        for modname, error in server.cache.reload():
+            server.log("Cannot reload %s: %s" % (modname, error))
+        try:
+            if 'module' in request:
+                name = request['module']
+                output, cached = server.cache.render_module(name, format)
+            elif 'symbol' in request:
+                name = request['symbol']
+                output, cached = server.cache.render_symbol(name, format)
+            else:
+                return {'error': "the request needs a module or a symbol"}
+        except Exception as e:
+            server.log("Cannot document %s: %s" % (request.get(
+                'module', request.get('symbol')), e))
+            return {'error': "%s: %s" % (type(e).__name__, e)}
+
+        if cached:
+            server.log("  %s (%s, cached)" % (name, format))
+        else:
+            server.log("  %s (%s)" % (name, format))
+        return {'output': output, 'cached': cached}
+
+    def handle(self):
+        for line in self.rfile:
+            if line.strip():
+                response = self._respond(line)
+                self.wfile.write(json.dumps(response).encode('utf-8') + b'\n')
+                self.wfile.flush()
+
+
+class Server(socketserver.UnixStreamServer):
+    """A server that answers requests from one client at a time.
+
+    Documenting is done in the thread that calls `serve_forever()`
+    because importing in many threads at once doesn't work well. *cache*
+    should be a [bananadoc.server.Cache] object and *log* is called with
+    messages to show to the user, or the messages are ignored if it's
+    None.
+    """
+
+    def __init__(self, path, cache, log=None):
+        self.path = path
+        self.cache = cache
+        self.log = log or (lambda message: None)
+        if os.path.exists(path):
+            # A server that was killed leaves the socket file behind.
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                try:
+                    sock.connect(path)
+                except OSError:
+                    os.remove(path)
+                else:
+                    raise OSError("a server is already running in %s"
+                                  % path)
+        super().__init__(path, _Handler)
+
+    def server_close(self):
+        super().server_close()
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def request(path, fields):
+    """Send a request to a server and return its response.
+
+    *path* is the socket file and *fields* is a dict like
+    `{"module": "fooproject.bar"}`. The response is also a dict.
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(path)
+        sock.sendall(json.dumps(fields).encode('utf-8') + b'\n')
+        with sock.makefile('rb') as file:
+            return json.loads(file.readline().decode('utf-8'))
@@ -0,0 +1,179 @@
+# Copyright (c) 2017 Akuli
+
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+"""Split the documentation of a big package into shards.
+
+`--shard I/N` documents only some of the modules, so N machines can
+document a package together. Every machine finds all the modules in the
+same order, and [bananadoc.shard.assign] splits them into N shards so
+that the shards take about the same time. After that, `bananadoc merge`
+combines the output directories of the shards.
+
+Each shard's output directory gets a file named `FILENAME` that looks
+like this:
+
+```
+{"version": 1, "root": "fooproject", "shard": [1, 4],
+ "formats": ["markdown"], "fingerprint": "...",
+ "modules": ["fooproject", "fooproject.bar", ...]}
+```
+
+The fingerprint is the fingerprint of the shard's manifest. Modules
+with references to modules in other shards can't be rendered in the
+shard, so their section trees are saved to an IR file named
+`IR_FILENAME` and `bananadoc merge` renders them.
+"""
+
+import collections
+import importlib.util
+import json
+import os
+import re
+
+import bananadoc
+import bananadoc.static
+
+
+FILENAME = '.bananadoc-shard.json'
+IR_FILENAME = '.bananadoc-shard-ir.jsonl.gz'
+VERSION = 1
+
+
+def parse_spec(spec):
+    """Convert a string like `'2/4'` to a `(2, 4)` tuple.
+
+    The first shard is 1, not 0. ValueError is raised if the string is
+    not valid.
+    """
+    match = re.fullmatch(r'\s*(\d+)\s*/\s*(\d+)\s*', spec)
+    if match is None:
+        raise ValueError("the shard should be like 2/4, not %r" % spec)
+    index, count = map(int, match.groups())
+    if not 1 <= index <= count:
+        raise ValueError("the shard must be between 1/%d and %d/%d"
+                         % (count, count, count))
+    return index, count
+
+
+def _find(modname, static):
+    # Returns (filename, is_package) without running the module's code.
+    if static:
+        module = bananadoc.static.find_module(modname)
+        return module.__file__, hasattr(module, '__path__')
+    spec = importlib.util.find_spec(modname)
+    if spec is None:
+        raise ImportError("no module named %r" % modname, name=modname)
+    return spec.origin, spec.submodule_search_locations is not None
+
+
+def discover(rootname, static=False, submodules=True):
+    """Find the modules that bananadoc would document.
+
+    This returns a list of `(modname, filename)` pairs in the same order
+    as bananadoc documents them. Packages are parsed to find out which
+    submodules they have, but other modules are not imported.
+    """
+    result = []
+    queue = collections.deque([rootname])
+    while queue:
+        modname = queue.popleft()
+        filename, is_package = _find(modname, static)
+        result.append((modname, filename))
+        if is_package and submodules:
+            if static:
+                junk, subs = bananadoc.parse_module_static(modname)
+            else:
+                junk, subs = bananadoc.parse_module(modname)
+            queue.extend(subs)
+    return result
+
+
+def weights(modules, timings=None):
+    """Estimate how long documenting each module takes.
+
+    *modules* is a list from [bananadoc.shard.discover] and *timings* is
+    a dict from `bananadoc.manifest.timings`. The modules that have no
+    timings are assumed to take time proportional to the sizes of their
+    files. This returns a `{modname: weight}` dict.
+    """
+    sizes = {}
+    for modname, filename in modules:
+        try:
+            sizes[modname] = os.path.getsize(filename)
+        except (OSError, TypeError):
+            # TypeError means that filename is None.
+            sizes[modname] = 0
+
+    timings = {modname: seconds for modname, seconds in (timings or {}).items()
+               if modname in sizes and seconds is not None}
+    if not timings:
+        return sizes
+
+    # Seconds per byte of the modules with timings.
+    timed_size = sum(sizes[modname] for modname in timings)
+    rate = sum(timings.values()) / max(timed_size, 1)
+    return {modname: timings.get(modname, size * rate)
+            for modname, size in sizes.items()}
+
+
+def assign(weights, count):
+    """Split modules into *count* shards with about the same total weight.
+
+    The heaviest modules are assigned first, each to the shard that has
+    the smallest total weight so far. Ties are broken by module names
+    and shard numbers, so the result is the same on every machine. This
+    returns a list of *count* sets of module names.
+    """
+    shards = [set() for junk in range(count)]
+    totals = [0] * count
+    for modname in sorted(weights, key=lambda name: (-weights[name], name)):
+        index = min(range(count), key=lambda i: (totals[i], i))
+        shards[index].add(modname)
+        totals[index] += weights[modname]
+    return shards
+
+
+def write_info(outdir, info):
+    """Save a dict like the one shown above to *outdir*."""
+    info = dict(info, version=VERSION)
+    with open(os.path.join(outdir, FILENAME), 'w', encoding='utf-8') as f:
+        json.dump(info, f, indent=1, sort_keys=True)
+        f.write('\n')
+
+
+def read_info(outdir):
+    """Load the dict that [bananadoc.shard.write_info] saved.
+
+    ValueError is raised if *outdir* is not the output directory of a
+    shard or the shard was written by a different version of bananadoc.
+    """
+    path = os.path.join(outdir, FILENAME)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            info = json.load(f)
+    except FileNotFoundError:
+        raise ValueError("%s is not the output directory of a shard"
+                         % outdir)
+    if info.get('version') != VERSION:
+        raise ValueError("%s was written with a different version of "
+                         "bananadoc" % path)
+    return info
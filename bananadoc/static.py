@@ -0,0 +1,789 @@
+# Copyright (c) 2017 Akuli
+
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""Parse modules without importing them.
+
+Importing a module runs its code, and that can be slow if the module
+imports lots of other things. The functions here read the source files
+with the [ast](https://docs.python.org/3/library/ast.html) module
+instead, so documenting a module costs about as much as reading it.
+
+The section trees look like the trees [bananadoc.parse_module]
+creates, but the parsing functions added with
+[bananadoc.parsingfunc] are only used for data that can be
+evaluated without running any code, like numbers and strings. Module
+hooks are called like they are called by [bananadoc.parse_module].
+"""
+
+import ast
+import builtins
+import functools
+import importlib.machinery
+import importlib.util
+import inspect
+import tokenize
+
+from bananadoc import parse
+
+
+__all__ = ['find_module', 'parse_module_static', 'dependencies',
+           'canonical_names', 'clear_cache']
+
+# These are the enum base classes in the enum module.
+_ENUM_BASES = {'Enum', 'IntEnum', 'StrEnum', 'Flag', 'IntFlag', 'ReprEnum'}
+
+
+class _Source:
+    """A value that couldn't be evaluated.
+
+    The repr of this is the source code of the value, so the value shows
+    up nicely in the data sections and signatures.
+    """
+
+    def __init__(self, source):
+        self.source = source
+
+    def __repr__(self):
+        return self.source
+
+
+def _evaluate(node):
+    """Evaluate a literal node or return a _Source object."""
+    try:
+        return ast.literal_eval(node)
+    except ValueError:
+        return _Source(ast.unparse(node))
+
+
+def _docstring(node):
+    # clean=False because we want the same thing as __doc__.
+    return ast.get_docstring(node, clean=False)
+
+
+def _decorator_names(node):
+    names = []
+    for decorator in node.decorator_list:
+        if isinstance(decorator, ast.Call):
+            decorator = decorator.func
+        names.append(ast.unparse(decorator))
+    return names
+
+
+class _Binding:
+    """A name bound in a module or class body.
+
+    The *kind* is one of these strings:
+    - `'function'`, `'class'`: *node* is the def or class statement
+    - `'lambda'`: *node* is the lambda expression
+    - `'data'`: *node* is the value expression, or None if it's unknown
+    - `'import'`: *module* and *attribute* tell what is imported, and
+      *attribute* is None for `import something` statements
+    """
+
+    def __init__(self, kind, node=None, module=None, attribute=None):
+        self.kind = kind
+        self.node = node
+        self.module = module
+        self.attribute = attribute
+
+
+def _bind_targets(bindings, targets, value):
+    for target in targets:
+        if isinstance(target, ast.Name):
+            if isinstance(value, ast.Lambda):
+                bindings[target.id] = _Binding('lambda', value)
+            else:
+                bindings[target.id] = _Binding('data', value)
+        elif isinstance(target, (ast.Tuple, ast.List)):
+            if (isinstance(value, (ast.Tuple, ast.List))
+                    and len(value.elts) == len(target.elts)):
+                for subtarget, subvalue in zip(target.elts, value.elts):
+                    _bind_targets(bindings, [subtarget], subvalue)
+            else:
+                _bind_targets(bindings, target.elts, None)
+
+
+class _StaticModule:
+    """The things that we know about a module without importing it."""
+
+    def __init__(self, module, tree):
+        self.module = module
+        self.name = module.__name__
+        self.tree = tree
+        self.all_list = None
+        self.all_unknown = False
+        self.future_annotations = False
+        self.dependencies = set()
+        self.canonical_names = {}
+        self.bindings = {}      # {name: _Binding}
+        self.star_imports = []  # names of modules, from import * order
+        self._collect(tree.body)
+
+    def _resolve_relative(self, level, modulename):
+        if level == 0:
+            return modulename
+        package = self.name
+        if not hasattr(self.module, '__path__'):
+            package = package.rpartition('.')[0]
+        for junk in range(level - 1):
+            package = package.rpartition('.')[0]
+        if modulename:
+            return package + '.' + modulename
+        return package
+
+    def _collect_all(self, node):
+        # These are the usual ways to define __all__. Anything fancier
+        # than this can't be figured out without running the code.
+        try:
+            if isinstance(node, ast.Assign):
+                self.all_list = list(ast.literal_eval(node.value))
+            elif isinstance(node, ast.AugAssign):
+                self.all_list.extend(ast.literal_eval(node.value))
+            else:
+                method = node.value.func.attr
+                values = [ast.literal_eval(arg) for arg in node.value.args]
+                if method == 'append':
+                    self.all_list.extend(values)
+                else:
+                    self.all_list.extend(values[0])
+        except (ValueError, AttributeError, IndexError):
+            # parse_module_static() complains about this if it needs the
+            # __all__, but other modules are fine without it.
+            self.all_unknown = True
+
+    def _collect(self, body):
+        bindings = self.bindings
+        for node in body:
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef,
+                                 ast.ClassDef)):
+                kind = 'class' if isinstance(node, ast.ClassDef) else 'function'
+                bindings[node.name] = _Binding(kind, node)
+            elif isinstance(node, (ast.Assign, ast.AnnAssign)):
+                targets = (node.targets if isinstance(node, ast.Assign)
+                           else [node.target])
+                if any(isinstance(target, ast.Name) and target.id == '__all__'
+                       for target in targets):
+                    self._collect_all(node)
+                elif node.value is not None:
+                    _bind_targets(bindings, targets, node.value)
+            elif (isinstance(node, ast.AugAssign)
+                  and isinstance(node.target, ast.Name)
+                  and node.target.id == '__all__'):
+                self._collect_all(node)
+            elif (isinstance(node, ast.Expr)
+                  and isinstance(node.value, ast.Call)
+                  and ast.unparse(node.value.func) in {'__all__.append',
+                                                       '__all__.extend'}):
+                self._collect_all(node)
+            elif isinstance(node, ast.Import):
+                for alias in node.names:
+                    if alias.asname is None:
+                        # import a.b.c binds a
+                        name = alias.name.split('.')[0]
+                        bindings[name] = _Binding('import', module=name)
+                    else:
+                        bindings[alias.asname] = _Binding(
+                            'import', module=alias.name)
+            elif isinstance(node, ast.ImportFrom):
+                modulename = self._resolve_relative(node.level, node.module)
+                if modulename == '__future__':
+                    if any(alias.name == 'annotations'
+                           for alias in node.names):
+                        self.future_annotations = True
+                for alias in node.names:
+                    if alias.name == '*':
+                        # The other module is parsed when a name is
+                        # looked up.
+                        self.star_imports.append(modulename)
+                        continue
+                    bindings[alias.asname or alias.name] = _Binding(
+                        'import', module=modulename, attribute=alias.name)
+            elif isinstance(node, (ast.If, ast.Try)):
+                # try: import enum / except ImportError: enum = None
+                # The last binding wins, just like it often would when
+                # the code runs.
+                self._collect(node.body)
+                for handler in getattr(node, 'handlers', []):
+                    self._collect(handler.body)
+                self._collect(node.orelse)
+                self._collect(getattr(node, 'finalbody', []))
+
+    def star_names(self):
+        """Return the names that `from module import *` would import."""
+        if self.all_list is not None and not self.all_unknown:
+            return set(self.all_list)
+        return {name for name in self.bindings if not name.startswith('_')}
+
+    def public_names(self):
+        """Return the names that dir(module) would give, without _names."""
+        names = {name for name in self.bindings if not name.startswith('_')}
+        for modulename in self.star_imports:
+            try:
+                names.update(_get_static_module(modulename).star_names())
+            except (ImportError, SyntaxError):
+                pass
+        if hasattr(self.module, '__path__'):
+            for name in parse._submodule_names(self.name,
+                                               self.module.__path__):
+                if not name.startswith('_'):
+                    names.add(name)
+        return names
+
+
+# {modulename: _StaticModule}
+_static_modules = {}
+
+
+def find_module(modulename):
+    """Return a module object for *modulename* without running its code.
+
+    The module object has the usual `__name__`, `__file__`, `__doc__`
+    and `__spec__` attributes, and `__path__` if it's a package, but
+    nothing is executed and so nothing else is set. This raises
+    ImportError if the module doesn't have a Python source file.
+    """
+    return _get_static_module(modulename).module
+
+
+def _get_static_module(modulename):
+    try:
+        return _static_modules[modulename]
+    except KeyError:
+        pass
+
+    # importlib.util.find_spec() would import the parent packages, so we
+    # need to look up everything one part at a time ourselves.
+    parent = modulename.rpartition('.')[0]
+    if parent:
+        path = getattr(find_module(parent), '__path__', None)
+        if path is None:
+            raise ImportError("%s is not a package" % parent, name=parent)
+    else:
+        path = None
+    spec = importlib.machinery.PathFinder.find_spec(modulename, path)
+    if (spec is None or spec.origin is None
+            or not spec.origin.endswith('.py')):
+        raise ImportError("cannot find Python source for %s" % modulename,
+                          name=modulename)
+
+    with tokenize.open(spec.origin) as f:
+        source = f.read()
+    tree = ast.parse(source, spec.origin)
+    # This creates a module object without running the module.
+    module = importlib.util.module_from_spec(spec)
+    module.__doc__ = _docstring(tree)
+
+    result = _static_modules[modulename] = _StaticModule(module, tree)
+    return result
+
+
+def clear_cache():
+    """Forget everything that was read from the source files.
+
+    Call this if the source files might have changed.
+    """
+    _static_modules.clear()
+
+
+def _is_submodule(modulename):
+    try:
+        _get_static_module(modulename)
+        return True
+    except (ImportError, SyntaxError):
+        return False
+
+
+class _Resolved:
+    """The result of looking up a name.
+
+    *kind* is `'module'`, `'external'` or a `_Binding` kind,
+    and *module* is the name of the module that defines the thing. For
+    modules, *node* is a `_StaticModule` or None.
+    """
+
+    def __init__(self, kind, module, name, node=None):
+        self.kind = kind
+        self.module = module
+        self.name = name
+        self.node = node
+
+
+def _resolve(staticmodule, name, seen=None):
+    """Find out where *name* in *staticmodule* comes from."""
+    seen = set() if seen is None else seen
+    if (staticmodule.name, name) in seen:
+        # import loop, give up
+        return _Resolved('external', staticmodule.name, name)
+    seen.add((staticmodule.name, name))
+
+    try:
+        binding = staticmodule.bindings[name]
+    except KeyError:
+        # Later star imports replace the names from earlier ones.
+        for modulename in reversed(staticmodule.star_imports):
+            try:
+                other = _get_static_module(modulename)
+            except (ImportError, SyntaxError):
+                continue
+            if name in other.star_names():
+                return _resolve(other, name, seen)
+        if hasattr(builtins, name):
+            return _Resolved('external', 'builtins', name)
+        return _Resolved('external', staticmodule.name, name)
+
+    if binding.kind != 'import':
+        return _Resolved(binding.kind, staticmodule.name, name, binding.node)
+    if binding.attribute is None:
+        return _resolve_module(binding.module)
+
+    submodulename = binding.module + '.' + binding.attribute
+    if _is_submodule(submodulename):
+        return _resolve_module(submodulename)
+    try:
+        other = _get_static_module(binding.module)
+    except (ImportError, SyntaxError):
+        if any(part.startswith('_') for part in binding.module.split('.')):
+            # Things like collections.OrderedDict come from C modules
+            # like _collections, but they pretend to be in the public
+            # module.
+            return _Resolved('external', staticmodule.name, binding.attribute)
+        return _Resolved('external', binding.module, binding.attribute)
+    return _resolve(other, binding.attribute, seen)
+
+
+def _resolve_module(modulename):
+    try:
+        staticmodule = _get_static_module(modulename)
+    except (ImportError, SyntaxError):
+        staticmodule = None
+    return _Resolved('module', modulename, modulename, staticmodule)
+
+
+def _resolve_expression(staticmodule, node):
+    """Like _resolve(), but for things like `enum.Enum`."""
+    if isinstance(node, ast.Subscript):
+        # Generic[T] and friends
+        node = node.value
+    if isinstance(node, ast.Name):
+        return _resolve(staticmodule, node.id)
+    if isinstance(node, ast.Attribute):
+        parent = _resolve_expression(staticmodule, node.value)
+        if parent.kind == 'module':
+            if parent.node is None:
+                return _Resolved('external', parent.module, node.attr)
+            return _resolve(parent.node, node.attr)
+    return _Resolved('external', None, ast.unparse(node))
+
+
+def _base_classes(staticmodule, classnode):
+    """Yield _Resolved objects for the base classes of a class."""
+    for base in classnode.bases:
+        yield _resolve_expression(staticmodule, base)
+
+
+def _is_subclass(staticmodule, classnode, check, seen=None):
+    seen = set() if seen is None else seen
+    for base in _base_classes(staticmodule, classnode):
+        if check(base):
+            return True
+        if base.kind == 'class' and id(base.node) not in seen:
+            seen.add(id(base.node))
+            if _is_subclass(_get_static_module(base.module), base.node,
+                            check, seen):
+                return True
+    return False
+
+
+def _is_exception(staticmodule, classnode):
+    def check(base):
+        if base.module != 'builtins':
+            return False
+        value = getattr(builtins, base.name)
+        return isinstance(value, type) and issubclass(value, Exception)
+    return _is_subclass(staticmodule, classnode, check)
+
+
+def _is_enum(staticmodule, classnode):
+    def check(base):
+        return base.module == 'enum' and base.name in _ENUM_BASES
+    return _is_subclass(staticmodule, classnode, check)
+
+
+def _signature(staticmodule, node):
+    """Create an inspect.Signature from a def statement or a lambda."""
+    def annotation(node):
+        if node is None:
+            return inspect.Parameter.empty
+        if staticmodule.future_annotations:
+            # the annotation is a string at runtime
+            return _Source(repr(ast.unparse(node)))
+        return _Source(ast.unparse(node))
+
+    def default(node):
+        if node is None:
+            return inspect.Parameter.empty
+        return _evaluate(node)
+
+    P = inspect.Parameter
+    args = node.args
+    positional = args.posonlyargs + args.args
+    defaults = [None] * (len(positional) - len(args.defaults)) + args.defaults
+    parameters = []
+    for index, (arg, dflt) in enumerate(zip(positional, defaults)):
+        if index < len(args.posonlyargs):
+            kind = P.POSITIONAL_ONLY
+        else:
+            kind = P.POSITIONAL_OR_KEYWORD
+        parameters.append(P(arg.arg, kind, default=default(dflt),
+                            annotation=annotation(arg.annotation)))
+    if args.vararg is not None:
+        parameters.append(P(args.vararg.arg, P.VAR_POSITIONAL,
+                            annotation=annotation(args.vararg.annotation)))
+    for arg, dflt in zip(args.kwonlyargs, args.kw_defaults):
+        parameters.append(P(arg.arg, P.KEYWORD_ONLY, default=default(dflt),
+                            annotation=annotation(arg.annotation)))
+    if args.kwarg is not None:
+        parameters.append(P(args.kwarg.arg, P.VAR_KEYWORD,
+                            annotation=annotation(args.kwarg.annotation)))
+
+    returns = annotation(getattr(node, 'returns', None))
+    return inspect.Signature(parameters, return_annotation=returns)
+
+
+def _class_sorting_key(kinds, name):
+    # This must sort like _class_sorting_key() in bananadoc.defaults. It
+    # uses getattr(cls, name), which gives a plain function for static
+    # methods and a bound method for class methods, so class methods go
+    # with the data and nested classes.
+    return {'function': 1, 'staticmethod': 1, 'property': 4,
+            'propertycall': 4}.get(kinds[name], 5), name
+
+
+def _module_sorting_key(staticmodule, name):
+    resolved = _resolve(staticmodule, name)
+    if resolved.kind == 'class':
+        classmodule = _get_static_module(resolved.module)
+        if _is_exception(classmodule, resolved.node):
+            return 3, name
+        return 1, name
+    if resolved.kind in {'function', 'lambda'}:
+        return 2, name
+    return 4, name
+
+
+class _StaticParser:
+    """This creates the sections, like the default parsing functions do."""
+
+    def __init__(self, staticmodule):
+        self.staticmodule = staticmodule
+        # names of modules that define the documented things
+        self.modules = {staticmodule.name}
+
+    def parse(self, section, name, resolved):
+        self.modules.add(resolved.module)
+        if resolved.kind == 'module' and resolved.node is not None:
+            # The parsing functions would document this as data.
+            value = _Source(
+                "<module %r from %r>" % (resolved.name,
+                                         resolved.node.module.__file__))
+        elif resolved.kind in {'module', 'external'}:
+            value = _Source('<%s.%s>' % (resolved.module, resolved.name))
+        elif resolved.kind == 'data':
+            if resolved.node is None:
+                value = _Source('...')
+            else:
+                value = _evaluate(resolved.node)
+        else:
+            getattr(self, 'parse_' + resolved.kind)(section, name, resolved)
+            return
+        # Data values that could be evaluated are real objects, so the
+        # parsing functions can take care of them.
+        section.parse_object(name, value)
+
+    def parse_lambda(self, section, name, resolved):
+        # Lambdas are functions without docstrings.
+        raise parse.NoDocstring(section.fullname, name)
+
+    def parse_function(self, section, name, resolved):
+        node = resolved.node
+        doc = _docstring(node)
+        if doc is None:
+            raise parse.NoDocstring(section.fullname, name)
+        staticmodule = _get_static_module(resolved.module)
+        signature = _signature(staticmodule, node)
+        section.subs.append(parse.ObjectSection(
+            section.fullname, name, node,
+            title=name + str(signature),
+            content=inspect.cleandoc(doc)))
+
+    def parse_class(self, section, classname, resolved):
+        node = resolved.node
+        staticmodule = _get_static_module(resolved.module)
+        doc = _docstring(node)
+        if doc is None:
+            raise parse.NoDocstring(section.fullname, classname)
+
+        if _is_enum(staticmodule, node):
+            section.subs.append(parse.ObjectSection(
+                section.fullname, classname, node,
+                title="enum %s" % classname,
+                content=inspect.cleandoc(doc)))
+            return
+
+        bases = []
+        for base in _base_classes(staticmodule, node):
+            self.modules.add(base.module)
+            if base.name == 'object' or base.name.startswith('_'):
+                continue
+            if base.module in {section.fullname, 'builtins', None}:
+                bases.append(base.name)
+            else:
+                bases.append(base.module + '.' + base.name)
+        displayname = classname
+        if bases:
+            displayname += '(%s)' % ', '.join(bases)
+
+        classsection = parse.ObjectSection(
+            section.fullname, classname, node,
+            title="class %s" % displayname,
+            content=inspect.cleandoc(doc))
+        section.subs.append(classsection)
+
+        members = {}     # {name: (kind, node)}, in definition order
+        bananadoc_all = None
+        for member in node.body:
+            if isinstance(member, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                decorators = _decorator_names(member)
+                if 'property' in decorators:
+                    members[member.name] = ('property', member)
+                elif any(decorator.endswith(('.setter', '.deleter'))
+                         for decorator in decorators):
+                    # the docstring comes from the getter
+                    pass
+                elif 'classmethod' in decorators:
+                    members[member.name] = ('classmethod', member)
+                elif 'staticmethod' in decorators:
+                    members[member.name] = ('staticmethod', member)
+                else:
+                    members[member.name] = ('function', member)
+            elif isinstance(member, ast.ClassDef):
+                members[member.name] = ('class', member)
+            elif isinstance(member, (ast.Assign, ast.AnnAssign)):
+                targets = (member.targets if isinstance(member, ast.Assign)
+                           else [member.target])
+                for target in targets:
+                    if not isinstance(target, ast.Name):
+                        continue
+                    if target.id == '_bananadoc_all':
+                        bananadoc_all = list(ast.literal_eval(member.value))
+                    elif member.value is not None:
+                        value = member.value
+                        if (isinstance(value, ast.Call)
+                                and ast.unparse(value.func) == 'property'):
+                            members[target.id] = ('propertycall', value)
+                        elif isinstance(value, ast.Lambda):
+                            members[target.id] = ('function', value)
+                        else:
+                            members[target.id] = ('data', value)
+
+        if bananadoc_all is None:
+            names = [name for name in members
+                     if name == '__init__' or not name.startswith('_')]
+            kinds = {name: kind for name, (kind, junk) in members.items()}
+            names.sort(key=lambda name: _class_sorting_key(kinds, name))
+        else:
+            names = bananadoc_all
+
+        qualname = node.name
+        for name in names:
+            kind, member = members[name]
+            try:
+                self.parse_member(classsection, staticmodule, qualname,
+                                  name, kind, member, members)
+            except parse.NoDocstring as e:
+                # Undocumented __init__ methods are allowed, see
+                # bananadoc.defaults.
+                if name != '__init__':
+                    raise e
+
+    def parse_member(self, classsection, staticmodule, qualname,
+                     name, kind, member, members):
+        if kind == 'function':
+            if isinstance(member, ast.Lambda):
+                raise parse.NoDocstring(classsection.fullname, name)
+            self.parse_function(classsection, name, _Resolved(
+                kind, staticmodule.name, name, member))
+        elif kind == 'class':
+            self.parse_class(classsection, name, _Resolved(
+                kind, staticmodule.name, name, member))
+        elif kind in {'property', 'propertycall'}:
+            if kind == 'property':
+                doc = _docstring(member)
+            else:
+                doc = self._property_call_doc(member, members)
+            if doc is None:
+                raise parse.NoDocstring(classsection.fullname, name)
+            classsection.subs.append(parse.ObjectSection(
+                classsection.fullname, name, member,
+                title="The %s property" % name,
+                content=inspect.cleandoc(doc)))
+        elif kind in {'classmethod', 'staticmethod'}:
+            # classmethod and staticmethod objects aren't functions, so
+            # the default parsing functions treat them as data.
+            classsection.parse_object(name, _Source(
+                '<%s(<function %s.%s>)>' % (kind, qualname, name)))
+        else:
+            classsection.parse_object(name, _evaluate(member))
+
+    def _property_call_doc(self, call, members):
+        for keyword in call.keywords:
+            if keyword.arg == 'doc':
+                value = _evaluate(keyword.value)
+                return value if isinstance(value, str) else None
+        if len(call.args) >= 4:
+            value = _evaluate(call.args[3])
+            return value if isinstance(value, str) else None
+        if call.args and isinstance(call.args[0], ast.Name):
+            kind, getter = members.get(call.args[0].id, (None, None))
+            if kind == 'function' and not isinstance(getter, ast.Lambda):
+                return _docstring(getter)
+        return None
+
+
+def _all_list(staticmodule):
+    if staticmodule.all_list is None:
+        all_list = sorted(staticmodule.public_names())
+        all_list.sort(key=lambda name: _module_sorting_key(staticmodule, name))
+        return all_list
+    return staticmodule.all_list
+
+
+def is_documented(rootname, modulename, name=None, submodules=True):
+    """Like `bananadoc.parse.is_documented()`, but static.
+
+    The source files are read instead of importing the modules.
+    """
+    if modulename == rootname:
+        parents = []
+    elif modulename.startswith(rootname + '.') and submodules:
+        parts = modulename.split('.')
+        parents = [('.'.join(parts[:i]), parts[i])
+                   for i in range(rootname.count('.') + 1, len(parts))]
+    else:
+        return False
+
+    try:
+        for parentname, childname in parents + [(modulename, name)]:
+            if childname is None:
+                break
+            staticmodule = _get_static_module(parentname)
+            if (staticmodule.all_unknown
+                    or childname not in _all_list(staticmodule)):
+                return False
+        return _is_submodule(modulename)
+    except (ImportError, SyntaxError):
+        return False
+
+
+def parse_module_static(modulename, registry=None):
+    """Like [bananadoc.parse_module], but without importing anything.
+
+    The module is found from `sys.path` and its source file is read and
+    parsed with the ast module. The *value* of the module section is a
+    module object that has not been executed (see `find_module` in
+    `bananadoc.static`), and other sections have ast nodes as their
+    *value* attributes.
+    """
+    staticmodule = _get_static_module(modulename)
+    module = staticmodule.module
+    if module.__doc__ is None:
+        raise parse.NoDocstring(modulename)
+    its_a_package = hasattr(module, '__path__')
+
+    if staticmodule.all_unknown:
+        raise ValueError("cannot figure out __all__ of %s without "
+                         "importing it" % modulename)
+    all_list = _all_list(staticmodule)
+
+    doc = inspect.cleandoc(module.__doc__)
+    summary, junk, description = doc.partition('\n')
+    title = modulename
+    if summary:
+        title += " - "
+        title += parse._clean_summary(summary)
+
+    mainsection = parse.ObjectSection(None, modulename, module,
+                                      title=title, content=description)
+
+    if its_a_package:
+        submodule_names = parse._submodule_names(modulename, module.__path__)
+    else:
+        submodule_names = frozenset()
+
+    parser = _StaticParser(staticmodule)
+    submodules = []
+    canonical = {}
+    for name in all_list:
+        # Extension modules are in the index, but they can't be
+        # documented without importing them.
+        if name in submodule_names and _is_submodule(modulename + '.' + name):
+            submodules.append(modulename + '.' + name)
+            continue
+        resolved = _resolve(staticmodule, name)
+        if resolved.kind in {'function', 'class'}:
+            canonical[name] = resolved.module + '.' + resolved.node.name
+        if registry is not None and resolved.kind in {'function', 'class'}:
+            key = (resolved.module, resolved.node.name)
+            registry.parse_object(
+                mainsection, name, resolved.node, functools.partial(
+                    parser.parse, mainsection, name, resolved), key)
+        else:
+            parser.parse(mainsection, name, resolved)
+
+    for hook in parse._modulehooks:
+        hook(mainsection)
+
+    staticmodule.dependencies = {
+        _static_modules[name].module.__file__
+        for name in parser.modules if name in _static_modules}
+    staticmodule.canonical_names = canonical
+    return mainsection, submodules
+
+
+def dependencies(modulename):
+    """Return a set of source files that the documentation depends on.
+
+    This only works after calling [bananadoc.static.parse_module_static]
+    with the same *modulename*.
+    """
+    return _static_modules[modulename].dependencies
+
+
+def canonical_names(modulename):
+    """Return a dict of the names of classes and functions in a module.
+
+    The keys are names in the module and the values are full names of
+    where the classes and functions are defined, like `'foo.bar.Baz'`.
+    This only works after calling
+    [bananadoc.static.parse_module_static] with the same
+    *modulename*.
+    """
+    return _static_modules[modulename].canonical_names
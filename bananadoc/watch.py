@@ -0,0 +1,119 @@
+# Copyright (c) 2017 Akuli
+
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""Notice changed source files and reload the modules that use them.
+
+The standard library can't get notifications about changed files from
+the operating system, so this checks the modification times of the
+files every now and then.
+"""
+
+import importlib
+import os
+import sys
+
+import bananadoc.parse
+import bananadoc.static
+
+
+def _stat(path):
+    try:
+        result = os.stat(path)
+    except OSError:
+        return None
+    return (result.st_mtime_ns, result.st_size)
+
+
+class FileWatcher:
+    """Remember modification times of files and check if they changed."""
+
+    def __init__(self):
+        self._stats = {}
+
+    def add(self, path):
+        """Start watching a file if it's not watched already."""
+        path = os.path.abspath(path)
+        if path not in self._stats:
+            self._stats[path] = _stat(path)
+
+    def changed(self):
+        """Return a set of absolute paths of files that changed.
+
+        A file that changed is reported once, and not again until it
+        changes again.
+        """
+        result = set()
+        for path, old in self._stats.items():
+            new = _stat(path)
+            if new != old:
+                self._stats[path] = new
+                result.add(path)
+        return result
+
+
+def reload_modules(paths):
+    """Reload all imported modules that come from the given files.
+
+    The modules are reloaded in the order they were imported, which is
+    usually the order that their dependencies need. This returns a list
+    of `(modulename, exception)` pairs for the modules that could not be
+    reloaded.
+    """
+    paths = {os.path.abspath(path) for path in paths}
+    failed = []
+    for module in list(sys.modules.values()):
+        filename = getattr(module, '__file__', None)
+        if filename is not None and os.path.abspath(filename) in paths:
+            try:
+                importlib.reload(module)
+            except Exception as e:
+                failed.append((module.__name__, e))
+    bananadoc.parse.clear_caches()
+    return failed
+
+
+def reload_changed(changed, modules, static=False):
+    """Reload changed files and the modules that depend on them.
+
+    *changed* is a set from [bananadoc.watch.FileWatcher.changed], and
+    *modules* is a dict with module names as keys and `(filename,
+    files)` pairs as values, where *files* are the files that the
+    documentation of the module depends on. This returns a list of
+    names of the modules that must be documented again and a list like
+    [bananadoc.watch.reload_modules] returns. Nothing is reloaded if
+    *static* is true, because the modules weren't imported.
+    """
+    # Submodules may have been added or removed.
+    bananadoc.parse.clear_caches()
+    if static:
+        bananadoc.static.clear_cache()
+        failed = []
+    else:
+        failed = reload_modules(changed)
+    stale = [modname for modname, (filename, files) in modules.items()
+             if changed.intersection(files)]
+    if not static:
+        # The modules that use things from the changed modules must
+        # also be reloaded.
+        filenames = {os.path.abspath(modules[modname][0])
+                     for modname in stale}
+        failed.extend(reload_modules(filenames - changed))
+    return stale, failed
@@ -0,0 +1,215 @@
+# Copyright (c) 2017 Akuli
+
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""Run functions in worker processes that are thrown away regularly.
+
+Every imported module stays in `sys.modules` until the process exits,
+so documenting a big project in one process uses more and more memory.
+The workers here are replaced with new processes after they have done
+a given number of tasks or used too much memory, and a worker that
+takes too long is killed.
+"""
+
+import collections
+import concurrent.futures
+import multiprocessing
+import sys
+import threading
+import traceback
+
+try:
+    import resource
+except ImportError:
+    # Windows, memory limits are not supported
+    resource = None
+
+
+class WorkerTimeout(Exception):
+    """This is raised when a task takes too long."""
+
+
+class WorkerDied(Exception):
+    """This is raised when a worker process exits in the middle of a task."""
+
+
+class _RemoteTraceback(Exception):
+
+    def __init__(self, text):
+        self.text = text
+
+    def __str__(self):
+        return self.text
+
+
+def _max_rss():
+    # ru_maxrss is in kilobytes on Linux and bytes on Mac OS X.
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        return maxrss
+    return maxrss * 1024
+
+
+def _worker(connection, max_tasks, max_memory):
+    # Starting a process takes a while, and that must not count as a part
+    # of the first task's timeout.
+    connection.send('ready')
+    done = 0
+    while True:
+        task = connection.recv()
+        if task is None:
+            break
+        func, args = task
+        try:
+            result = ('ok', func(*args), None)
+        except Exception as e:
+            result = ('error', e, traceback.format_exc())
+
+        done += 1
+        retire = ((max_tasks is not None and done >= max_tasks)
+                  or (max_memory is not None and resource is not None
+                      and _max_rss() > max_memory))
+        try:
+            connection.send(result + (retire,))
+        except Exception as e:
+            # The result or the exception can't be pickled.
+            connection.send(('error', RuntimeError(str(e)),
+                             traceback.format_exc(), retire))
+        if retire:
+            break
+    connection.close()
+
+
+class IsolatedPool(concurrent.futures.Executor):
+    """An executor that runs each task in a worker process.
+
+    The processes are started with the `spawn` method, so they don't
+    inherit any imported modules from this process. A worker is
+    replaced with a new process after *max_tasks* tasks, or when its
+    maximum resident memory is more than *max_memory* bytes. Tasks that
+    take longer than *timeout* seconds raise
+    [bananadoc.workers.WorkerTimeout] and the worker is killed. The time
+    it takes to start a new worker doesn't count. Any of these can be
+    None for no limit.
+    """
+
+    def __init__(self, workers=1, max_tasks=None, max_memory=None,
+                 timeout=None):
+        self.max_tasks = max_tasks
+        self.max_memory = max_memory
+        self.timeout = timeout
+        self.started_workers = 0
+        self._context = multiprocessing.get_context('spawn')
+        self._tasks = collections.deque()
+        self._condition = threading.Condition()
+        self._shut_down = False
+        # Each thread talks to one worker process at a time.
+        self._threads = [threading.Thread(target=self._run, daemon=True)
+                         for junk in range(workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, func, *args):
+        future = concurrent.futures.Future()
+        with self._condition:
+            if self._shut_down:
+                raise RuntimeError("cannot submit after shutdown")
+            self._tasks.append((future, func, args))
+            self._condition.notify()
+        return future
+
+    def shutdown(self, wait=True, *, cancel_futures=False):
+        with self._condition:
+            self._shut_down = True
+            if cancel_futures:
+                while self._tasks:
+                    self._tasks.popleft()[0].cancel()
+            self._condition.notify_all()
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+    def _start_worker(self):
+        ours, theirs = self._context.Pipe()
+        process = self._context.Process(
+            target=_worker, args=(theirs, self.max_tasks, self.max_memory),
+            daemon=True)
+        process.start()
+        theirs.close()
+        # Many threads start workers.
+        with self._condition:
+            self.started_workers += 1
+        try:
+            ours.recv()
+        except EOFError:
+            process.join()
+            raise WorkerDied("the worker process exited with code %s "
+                             "before it was ready" % process.exitcode)
+        return process, ours
+
+    def _run(self):
+        process = connection = None
+        while True:
+            with self._condition:
+                while not self._tasks and not self._shut_down:
+                    self._condition.wait()
+                if not self._tasks:
+                    break
+                future, func, args = self._tasks.popleft()
+            if not future.set_running_or_notify_cancel():
+                continue
+
+            if process is None:
+                try:
+                    process, connection = self._start_worker()
+                except WorkerDied as e:
+                    future.set_exception(e)
+                    continue
+            connection.send((func, args))
+            if not connection.poll(self.timeout):
+                process.kill()
+                process.join()
+                process = connection = None
+                future.set_exception(WorkerTimeout(
+                    "the task didn't finish in %g seconds" % self.timeout))
+                continue
+
+            try:
+                status, value, text, retire = connection.recv()
+            except EOFError:
+                process.join()
+                future.set_exception(WorkerDied(
+                    "the worker process exited with code %s"
+                    % process.exitcode))
+                process = connection = None
+                continue
+
+            if status == 'ok':
+                future.set_result(value)
+            else:
+                value.__cause__ = _RemoteTraceback(text)
+                future.set_exception(value)
+            if retire:
+                process.join()
+                process = connection = None
+
+        if process is not None:
+            connection.send(None)
+            process.join()
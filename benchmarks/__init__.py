@@ -0,0 +1,42 @@
+# Copyright (c) 2017 Akuli
+
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""Benchmarks for BananaDoc.
+
+Run them like this in the directory that contains `bananadoc` and
+`benchmarks`:
+
+```
+$ python3 -m benchmarks
+```
+
+This generates a synthetic package into a temporary directory, and then
+times importing it, [bananadoc.parse_module], dumping the sections
+and running `python3 -m bananadoc` on it. Run `python3 -m benchmarks
+--help` to see how the generated package can be changed.
+
+The results can be saved with `--save` and they are compared with the
+saved results on later runs, so slowdowns are easy to notice.
+"""
+
+from benchmarks.generate import generate
+
+__all__ = ['generate']
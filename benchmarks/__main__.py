@@ -0,0 +1,232 @@
+# Copyright (c) 2017 Akuli
+
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""Run the benchmarks."""
+
+import argparse
+import importlib
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:
+    # Windows
+    resource = None
+
+import bananadoc
+from benchmarks.generate import generate
+
+
+_here = os.path.dirname(os.path.abspath(__file__))
+_default_baseline = os.path.join(_here, 'baseline.json')
+# The results can be compared only if these are the same.
+_parameters = ['name', 'modules', 'classes', 'width', 'depth',
+               'reexport_ratio', 'data_size']
+
+
+def _time(func, *args):
+    """Call func(*args) and return (result, seconds)."""
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def _peak_memory(func, *args):
+    """Call func(*args) and return the most memory it used at once.
+
+    This is slow, so it must not be used together with _time().
+    """
+    tracemalloc.start()
+    try:
+        func(*args)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def _import_all(modnames):
+    for modname in modnames:
+        importlib.import_module(modname)
+
+
+def _parse_all(modnames):
+    return [bananadoc.parse_module(modname)[0] for modname in modnames]
+
+
+def _dump_all(sections):
+    for section in sections:
+        section.dump(io.StringIO())
+
+
+def _end_to_end(directory, name):
+    env = dict(os.environ)
+    # bananadoc must be importable in the subprocess.
+    env['PYTHONPATH'] = os.pathsep.join(
+        [os.path.dirname(_here)] + env.get('PYTHONPATH', '').split(os.pathsep))
+    start = time.perf_counter()
+    subprocess.check_call(
+        [sys.executable, '-m', 'bananadoc', '--yes', '--quiet',
+         '--outdir', os.path.join(directory, 'docs'), name],
+        cwd=directory, env=env)
+    seconds = time.perf_counter() - start
+    if resource is None:
+        return seconds, None
+    # ru_maxrss is in kilobytes on Linux and bytes on Mac OS X.
+    maxrss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    if sys.platform != 'darwin':
+        maxrss *= 1024
+    return seconds, maxrss
+
+
+def run(args):
+    """Run all benchmarks and return a dict of results."""
+    with tempfile.TemporaryDirectory() as directory:
+        modnames = generate(
+            directory, args.name, args.modules, args.classes, args.width,
+            args.depth, args.reexport_ratio, args.data_size)
+        sys.path.insert(0, directory)
+        try:
+            junk, import_time = _time(_import_all, modnames)
+            bananadoc.parse.clear_caches()
+            sections, parse_time = _time(_parse_all, modnames)
+            junk, dump_time = _time(_dump_all, sections)
+
+            # Parsing again must not be faster because of the caches.
+            del sections
+            bananadoc.parse.clear_caches()
+            parse_peak = _peak_memory(_parse_all, modnames)
+            dump_peak = _peak_memory(_dump_all, _parse_all(modnames))
+        finally:
+            sys.path.remove(directory)
+        end_to_end_time, end_to_end_peak = _end_to_end(directory, args.name)
+
+    results = {
+        'modules': len(modnames),
+        'import_seconds': import_time,
+        'parse_seconds': parse_time,
+        'parse_peak_bytes': parse_peak,
+        'dump_seconds': dump_time,
+        'dump_peak_bytes': dump_peak,
+        'end_to_end_seconds': end_to_end_time,
+    }
+    if end_to_end_peak is not None:
+        results['end_to_end_peak_bytes'] = end_to_end_peak
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Return a list of names of results that are worse than the baseline.
+
+    A result is worse if it's more than *tolerance* times bigger than
+    the baseline value, e.g. 0.2 means 20% bigger.
+    """
+    worse = []
+    for key, value in results.items():
+        if key == 'modules' or key not in baseline:
+            continue
+        if value > baseline[key] * (1 + tolerance):
+            worse.append(key)
+    return worse
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark BananaDoc.")
+    parser.add_argument(
+        '--name', default='benchpkg', help="name of the generated package")
+    parser.add_argument(
+        '--modules', type=int, default=200, help="number of modules")
+    parser.add_argument(
+        '--classes', type=int, default=5, help="number of classes per module")
+    parser.add_argument(
+        '--width', type=int, default=10, help="number of methods per class")
+    parser.add_argument(
+        '--depth', type=int, default=3, help="number of nested packages")
+    parser.add_argument(
+        '--reexport-ratio', type=float, default=0.2,
+        help="how many classes packages re-export from their modules")
+    parser.add_argument(
+        '--data-size', type=int, default=100,
+        help="number of items in a dict in each module")
+    parser.add_argument(
+        '--baseline', default=_default_baseline,
+        help="compare with results in this file, default: %(default)s")
+    parser.add_argument(
+        '--save', action='store_true',
+        help="save the results to the baseline file")
+    parser.add_argument(
+        '--tolerance', type=float, default=0.2,
+        help=("report results that are this much worse than the "
+              "baseline, defaults to %(default)s"))
+    args = parser.parse_args()
+
+    results = run(args)
+    for key, value in results.items():
+        if key.endswith('_bytes'):
+            print("%-20s %10.1f MiB" % (key[:-6], value / 1024 / 1024))
+        elif key.endswith('_seconds'):
+            print("%-20s %10.3f s" % (key[:-8], value))
+        else:
+            print("%-20s %10d" % (key, value))
+
+    parameters = {name: getattr(args, name) for name in _parameters}
+    if args.save:
+        with open(args.baseline, 'w') as f:
+            json.dump(dict(results, parameters=parameters), f, indent=4,
+                      sort_keys=True)
+            f.write('\n')
+        print("Results were saved to %s." % args.baseline)
+        return
+
+    try:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    except FileNotFoundError:
+        print("No baseline found. Use --save to create %s." % args.baseline)
+        return
+    different = [name for name in _parameters
+                 if baseline.get('parameters', {}).get(name)
+                 != parameters[name]]
+    if different:
+        options = ['--' + name.replace('_', '-') for name in different]
+        print("The baseline was made with different values of %s, so it "
+              "can't be compared." % ', '.join(options))
+        return
+
+    worse = compare(results, baseline, args.tolerance)
+    if worse:
+        print()
+        print("These results are worse than the baseline:")
+        for key in worse:
+            print("  %s: %g -> %g" % (key, baseline[key], results[key]))
+        sys.exit(1)
+    print()
+    print("No regressions compared to the baseline.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+# Copyright (c) 2017 Akuli
+
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""Generate synthetic packages for benchmarking."""
+
+import os
+
+
+__all__ = ['generate']
+
+
+def _module_source(name, classes, width, data_size):
+    lines = ['"""The %s module.' % name, '',
+             'This module was generated for benchmarking BananaDoc.',
+             '"""', '']
+    names = []
+    for i in range(classes):
+        classname = 'Class%d' % i
+        names.append(classname)
+        lines += ['', 'class %s:' % classname,
+                  '    """A generated class.', '',
+                  '    It has %d methods and a property.' % width,
+                  '    """', '',
+                  '    limit = %d' % i, '',
+                  '    @property',
+                  '    def value(self):',
+                  '        """The value of this thing."""',
+                  '        return 123', '']
+        for j in range(width):
+            lines += ['    def method%d(self, a, b=%d, *args, c=None):' % (j, j),
+                      '        """Do something with *a* and *b*.', '',
+                      '        This docstring has a second paragraph.',
+                      '        """', '']
+
+    names.append('function')
+    lines += ['', 'def function(x, y=1):',
+              '    """Return a generated result."""', '']
+
+    names.append('TABLE')
+    lines += ['', 'TABLE = {']
+    lines += ['    %d: %r,' % (i, 'value %d' % i) for i in range(data_size)]
+    lines += ['}', '']
+
+    lines.insert(5, '__all__ = %r' % names)
+    return '\n'.join(lines), names
+
+
+def generate(directory, name='benchpkg', modules=50, classes=5, width=10,
+             depth=2, reexport_ratio=0.2, data_size=100):
+    """Write a package called *name* to *directory*.
+
+    The package contains *depth* nested levels of subpackages, and
+    *modules* modules are spread evenly into them. Each module has
+    *classes* classes with *width* methods, one function and a
+    dictionary with *data_size* items. Each package re-exports about
+    *reexport_ratio* of the classes of its modules.
+
+    This returns a list of all module names in the package.
+    """
+    packages = [name]
+    for level in range(1, depth):
+        packages.append('%s.sub%d' % (packages[-1], level))
+
+    contents = {package: [] for package in packages}     # {package: names}
+    reexports = {package: [] for package in packages}
+    for i in range(modules):
+        package = packages[i % len(packages)]
+        modname = 'mod%d' % i
+        source, names = _module_source(
+            '%s.%s' % (package, modname), classes, width, data_size)
+        path = os.path.join(directory, *package.split('.'))
+        os.makedirs(path, exist_ok=True)
+        with open(os.path.join(path, modname + '.py'), 'w') as f:
+            f.write(source)
+        contents[package].append(modname)
+
+        count = int(round(classes * reexport_ratio))
+        reexports[package].extend((modname, name) for name in names[:count])
+
+    for index, package in enumerate(packages):
+        lines = ['"""The %s package."""' % package, '']
+        exported = list(contents[package])
+        if index + 1 < len(packages):
+            exported.append(packages[index+1].split('.')[-1])
+        for modname, classname in reexports[package]:
+            alias = '%s_%s' % (modname, classname)
+            lines.append('from .%s import %s as %s' % (
+                modname, classname, alias))
+            exported.append(alias)
+        lines += ['', '__all__ = %r' % exported, '']
+        path = os.path.join(directory, *package.split('.'))
+        os.makedirs(path, exist_ok=True)
+        with open(os.path.join(path, '__init__.py'), 'w') as f:
+            f.write('\n'.join(lines))
+
+    return packages + ['%s.%s' % (package, modname)
+                       for package in packages
+                       for modname in contents[package]]
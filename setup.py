@@ -31,6 +31,9 @@ setup(
     version=bananadoc.__version__,
     description="collect docstrings to Markdown files",
     url='https://github.com/Akuli/bananadoc/',
-    packages=find_packages(),
+    packages=find_packages(exclude=['benchmarks', 'tests']),
+    python_requires='>=3.9',
+    # Without markdown, HTML output is created with a simpler converter.
+    extras_require={'html': ['markdown']},
     entry_points={'console_scripts': ['bananadoc=bananadoc.cmdline:main']},
 )
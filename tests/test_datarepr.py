@@ -0,0 +1,42 @@
+# Copyright (c) 2017 Akuli
+
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+"""Tests for bananadoc.datarepr."""
+
+import unittest
+
+from bananadoc import datarepr
+
+
+class BoundedReprTest(unittest.TestCase):
+
+    def test_deep_nesting(self):
+        self.assertEqual(datarepr.bounded_repr([[[[[[[[[1]]]]]]]]]),
+                         ('[[[[[[[...]]]]]]]', [datarepr.TOO_DEEP]))
+        self.assertEqual(datarepr.bounded_repr([[[[[[{1: {2: 3}}]]]]]]),
+                         ('[[[[[[{...}]]]]]]', [datarepr.TOO_DEEP]))
+        self.assertEqual(datarepr.bounded_repr([[[1]], {}]),
+                         ('[[[1]], {}]', []))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+# Copyright (c) 2017 Akuli
+
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+"""Tests for bananadoc.manifest."""
+
+import importlib
+import os
+import sys
+import tempfile
+import textwrap
+import unittest
+
+import bananadoc
+import bananadoc.manifest
+
+
+class DependenciesTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        sys.path.insert(0, self.directory.name)
+        self.addCleanup(sys.path.remove, self.directory.name)
+        for name in ['deppkg', 'deppkg.consts', 'deppkg._defaults']:
+            self.addCleanup(sys.modules.pop, name, None)
+        os.mkdir(os.path.join(self.directory.name, 'deppkg'))
+
+    def write(self, name, content):
+        path = os.path.join(self.directory.name, 'deppkg', name)
+        with open(path, 'w') as f:
+            f.write(textwrap.dedent(content))
+        return path
+
+    def test_reexported_data(self):
+        self.write('__init__.py', '''\
+            """A package."""
+            from deppkg.consts import TIMEOUT
+            __all__ = ['TIMEOUT']
+            ''')
+        consts = self.write('consts.py', '''\
+            from ._defaults import DEFAULT
+            TIMEOUT = DEFAULT
+            ''')
+        defaults = self.write('_defaults.py', 'DEFAULT = 5\n')
+        importlib.import_module('deppkg')
+        section, subs = bananadoc.parse_module('deppkg')
+        files = bananadoc.manifest.dependencies(section)
+        self.assertIn(os.path.abspath(consts), files)
+        self.assertIn(os.path.abspath(defaults), files)
+
+        outdir = os.path.join(self.directory.name, 'out')
+        manifest = bananadoc.manifest.Manifest(outdir, 'x')
+        manifest.record('deppkg', sys.modules['deppkg'].__file__, True, [],
+                        [], files)
+        manifest.save()
+        self.assertIsNotNone(
+            bananadoc.manifest.Manifest(outdir, 'x').lookup('deppkg'))
+        self.write('_defaults.py', 'DEFAULT = 10\n')
+        self.assertIsNone(
+            bananadoc.manifest.Manifest(outdir, 'x').lookup('deppkg'))
+
+    def test_hooks(self):
+        self.write('__init__.py', '"""A package."""\n')
+        hooks = os.path.join(self.directory.name, 'dephooks.py')
+        with open(hooks, 'w') as f:
+            f.write(textwrap.dedent('''\
+                import bananadoc
+
+                @bananadoc.modulehook
+                def hook(section):
+                    pass
+                '''))
+        self.addCleanup(sys.modules.pop, 'dephooks', None)
+        hook = importlib.import_module('dephooks').hook
+        self.addCleanup(bananadoc.parse._modulehooks.remove, hook)
+
+        importlib.import_module('deppkg')
+        section, subs = bananadoc.parse_module('deppkg')
+        self.assertIn(os.path.abspath(hooks),
+                      bananadoc.manifest.dependencies(section))
+
+
+if __name__ == '__main__':
+    unittest.main()
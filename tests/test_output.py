@@ -0,0 +1,73 @@
+# Copyright (c) 2017 Akuli
+
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""Tests for bananadoc.output."""
+
+import os
+import tempfile
+import unittest
+
+from bananadoc import output
+
+
+class SyncWriterTest(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.outdir = directory.name
+
+    def path(self, *parts):
+        return os.path.join(self.outdir, *parts)
+
+    def create(self, *parts):
+        os.makedirs(os.path.dirname(self.path(*parts)), exist_ok=True)
+        with open(self.path(*parts), 'w') as f:
+            f.write('{}')
+
+    def write(self, *relatives):
+        writer = output.SyncWriter(self.outdir, ['.json'], threads=0)
+        for relative in relatives:
+            writer.write(self.path(*relative.split('/')), 'content')
+        writer.close()
+        return writer
+
+    def test_other_files_are_kept(self):
+        self.create('.bananadoc-manifest.json')
+        self.create('mydata.json')
+        self.create('sub', 'mydata.json')
+        self.assertEqual(self.write('a.json').removed, 0)
+        self.assertEqual(self.write('a.json').removed, 0)
+        for parts in [['.bananadoc-manifest.json'], ['mydata.json'],
+                      ['sub', 'mydata.json'], ['a.json']]:
+            self.assertTrue(os.path.isfile(self.path(*parts)))
+
+    def test_stale_files_are_removed(self):
+        self.create('mydata.json')
+        self.write('a.json', 'b.json', 'sub/c.json', 'sub/deep/d.json')
+        writer = self.write('a.json')
+        self.assertEqual(writer.removed, 3)
+        self.assertEqual(sorted(os.listdir(self.outdir)),
+                         [output.FILENAME, 'a.json', 'mydata.json'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+# Copyright (c) 2017 Akuli
+
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""Tests for bananadoc.parse."""
+
+import importlib
+import os
+import sys
+import tempfile
+import textwrap
+import unittest
+
+import bananadoc
+import bananadoc.watch
+
+
+class ReloadTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        sys.path.insert(0, self.directory.name)
+        self.addCleanup(sys.path.remove, self.directory.name)
+        self.addCleanup(sys.modules.pop, 'reloadme', None)
+        # The file may be written again so quickly that its modification
+        # time doesn't change, and then an old .pyc file would be used.
+        self.addCleanup(setattr, sys, 'dont_write_bytecode',
+                        sys.dont_write_bytecode)
+        sys.dont_write_bytecode = True
+        self.path = os.path.join(self.directory.name, 'reloadme.py')
+
+    def write(self, docstring):
+        with open(self.path, 'w') as f:
+            f.write(textwrap.dedent('''\
+                """%s"""
+
+                def thing(a, b):
+                    """%s"""
+                ''' % (docstring, docstring)))
+
+    def test_docstring_changes(self):
+        self.write("Things live here.")
+        importlib.import_module('reloadme')
+        section, subs = bananadoc.parse_module('reloadme')
+        self.assertEqual(section.title, "reloadme - things live here")
+        self.assertEqual(section.subs[0].content, "Things live here.")
+
+        self.write("Other things live here.")
+        self.assertEqual(bananadoc.watch.reload_modules([self.path]), [])
+        section, subs = bananadoc.parse_module('reloadme')
+        self.assertEqual(section.title, "reloadme - other things live here")
+        self.assertEqual(section.subs[0].content,
+                         "Other things live here.")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,160 @@
+# Copyright (c) 2017 Akuli
+
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+"""Tests for bananadoc.static."""
+
+import importlib
+import os
+import sys
+import tempfile
+import textwrap
+import unittest
+
+import bananadoc
+import bananadoc.static
+
+
+FILES = {
+    '__init__.py': '''\
+        """A package for comparing the static and import modes."""
+
+        from .shapes import Shape, Color, ShapeError
+        from .funcs import *
+        from . import funcs
+
+        __all__ = ['Shape', 'Color', 'ShapeError', 'area', 'scale',
+                   'funcs', 'SIZES']
+
+        SIZES = {'small': 1, 'big': 10}
+        ''',
+    'shapes.py': '''\
+        """Shapes and colors."""
+
+        import enum
+
+        __all__ = ['Shape', 'Color', 'ShapeError']
+
+
+        class ShapeError(ValueError):
+            """Raised when a shape is bad."""
+
+
+        class Color(enum.Enum):
+            """A color."""
+            RED = 1
+            GREEN = 2
+
+
+        class Shape:
+            """A shape with sides."""
+
+            sides = 0
+
+            def __init__(self, name, *, color=None):
+                self.name = name
+
+            def _getname(self):
+                """The name of the shape."""
+                return self.name
+
+            name2 = property(_getname)
+
+            @property
+            def perimeter(self):
+                """The sum of the side lengths."""
+                return 0
+
+            @classmethod
+            def from_string(cls, string):
+                """Create a shape from a string."""
+
+            @staticmethod
+            def valid(name, /, strict=False):
+                """Check if a name is valid."""
+
+            def draw(self, canvas, x=0, y=0, *args, scale=1.0, **kwargs):
+                """Draw the shape."""
+
+            class Corner:
+                """A corner of a shape."""
+
+                def angle(self):
+                    """Return the angle in degrees."""
+        ''',
+    'funcs.py': '''\
+        """Functions for shapes."""
+
+        from .shapes import Shape
+
+        __all__ = ['area', 'scale']
+
+
+        def area(shape, /, unit='cm'):
+            """Return the area of a shape."""
+
+
+        def scale(shape, *, factor=2, keep_color=True):
+            """Return a scaled copy of a shape."""
+        ''',
+}
+
+
+class CompareTest(unittest.TestCase):
+    """Check that static parsing creates the same trees as importing."""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        os.mkdir(os.path.join(self.directory.name, 'cmppkg'))
+        for name, content in FILES.items():
+            path = os.path.join(self.directory.name, 'cmppkg', name)
+            with open(path, 'w') as f:
+                f.write(textwrap.dedent(content))
+        sys.path.insert(0, self.directory.name)
+        self.addCleanup(sys.path.remove, self.directory.name)
+        for name in ['cmppkg', 'cmppkg.shapes', 'cmppkg.funcs']:
+            self.addCleanup(sys.modules.pop, name, None)
+        self.addCleanup(bananadoc.static.clear_cache)
+        self.addCleanup(bananadoc.parse.clear_caches)
+
+    maxDiff = None
+
+    def check(self, modulename):
+        importlib.import_module(modulename)
+        section, subs = bananadoc.parse_module(modulename)
+        static_section, static_subs = bananadoc.parse_module_static(
+            modulename)
+        self.assertEqual(static_section.render(), section.render())
+        self.assertEqual(static_subs, subs)
+
+    def test_package(self):
+        self.check('cmppkg')
+
+    def test_classes(self):
+        self.check('cmppkg.shapes')
+
+    def test_signatures(self):
+        self.check('cmppkg.funcs')
+
+
+if __name__ == '__main__':
+    unittest.main()